@@ -35,12 +35,25 @@ if tcl_root.exists():
 hiddenimports = [
     'app',
     'config',
+    'conversation_history',
+    'device_shadow',
+    'emotion_ticker',
     'emotions',
     'emotion_output_store',
     'eyebrow_store',
+    'inference_scheduler',
+    'inference_worker',
+    'intent_router',
+    'led_matrix_frame',
     'led_matrix_store',
+    'matrix_animator',
     'settings_loader',
+    'settings_watcher',
     'llm',
+    'llm_backends',
+    'reply_text',
+    'response_cache',
+    'sentiment_service',
     'serial_client',
 ]
 hiddenimports += collect_submodules('tkinter')
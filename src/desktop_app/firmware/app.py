@@ -2,6 +2,7 @@ import threading
 import time
 import random
 import re
+import traceback
 import unicodedata
 from datetime import datetime
 from collections import deque
@@ -17,13 +18,31 @@ from tkinter import ttk
 
 import serial
 
-from config import CONTROL_LAB_DEFAULTS, EMOTION_BUZZER_ENABLED, EMOTION_BUZZER_MIN_INTENSITY, EMOTIONS, PAN_AUTO_SPEED_MS
+from config import (
+    CONTROL_LAB_DEFAULTS,
+    EMOTION_BUZZER_ENABLED,
+    EMOTION_BUZZER_MIN_INTENSITY,
+    EMOTIONS,
+    LLM_REQUEST_TIMEOUT_S,
+    PAN_AUTO_SPEED_MS,
+    SERIAL_POLL_INTERVAL_MS,
+    SERIAL_RX_BATCH_SIZE,
+    SETTINGS_WATCH_INTERVAL_MS,
+)
+from conversation_history import ConversationHistory
+from device_shadow import DeviceShadow
 from emotion_output_store import load_emotion_buzzer_pitch_map, load_emotion_rgb_map
+from emotion_ticker import EmotionTicker
 from emotions import EmotionEngine
 from eyebrow_store import browmap_command_for_emotion, load_eyebrow_angles
-from led_matrix_store import load_led_matrix_patterns, matrix_commands_for_emotion
-from llm import LlmEngine
-from serial_client import SerialManager
+from inference_scheduler import PRIORITY_CHAT, REQUEST_EXPIRED
+from intent_router import IntentMatch, IntentRouter
+from led_matrix_store import invalidate_matrix_command_cache, load_led_matrix_animations, load_led_matrix_patterns
+from llm import LOAD_FAILED, LOAD_READY, LlmEngine
+from matrix_animator import MatrixAnimator
+from serial_client import SerialFrame, SerialManager
+from settings_loader import settings_store
+from settings_watcher import SettingsWatcher
 
 
 class NierDesktopApp:
@@ -43,7 +62,6 @@ class NierDesktopApp:
         self.debug_vars = {}
         self.debug_enabled = tk.BooleanVar(value=False)
         self.recent_messages = deque(maxlen=3)
-        self.conversation_history = []
         self.lcd_scroll_after_id = None
         self.lcd_scroll_index = 0
         self.lcd_scroll_text = ""
@@ -83,18 +101,44 @@ class NierDesktopApp:
         self.last_hunger_pulse_at = 0.0
 
         self.serial = SerialManager(debug_cb=self._on_serial_tx_debug)
-        self.llm = LlmEngine(debug_cb=self._on_llm_debug)
-        self.emotions = EmotionEngine()
+        self.device_shadow = DeviceShadow()
+        self.intent_router = IntentRouter()
+        self.llm = LlmEngine(
+            debug_cb=self._on_llm_debug, state_cb=self._on_llm_load_state, intent_router=self.intent_router
+        )
+        self.conversation_history = ConversationHistory(count_tokens=self.llm.count_tokens)
+        self.emotions = EmotionEngine(intent_router=self.intent_router)
+        self.emotion_ticker = EmotionTicker(self.emotions, self._on_emotion_tick)
         self.matrix_patterns = load_led_matrix_patterns(EMOTIONS)
+        self.matrix_animator = MatrixAnimator(
+            self.serial.send_line,
+            self.serial.encoded_size,
+            load_led_matrix_animations(EMOTIONS, self.matrix_patterns),
+        )
         self.eyebrow_angles = load_eyebrow_angles(EMOTIONS)
         self.emotion_rgb_map = load_emotion_rgb_map(EMOTIONS)
         self.emotion_buzzer_pitch_map = load_emotion_buzzer_pitch_map(EMOTIONS)
         self.emotion_buzzer_min_intensity = max(0, min(100, int(EMOTION_BUZZER_MIN_INTENSITY)))
+        self.settings_watcher = SettingsWatcher(
+            settings_store(),
+            {
+                "desktop_app.emotion_rgb_by_emotion": self._reload_rgb_map,
+                "desktop_app.emotion_buzzer_pitch_by_emotion": self._reload_buzzer_map,
+                "desktop_app.emotion_buzzer_min_intensity": self._reload_buzzer_min_intensity,
+                "robot.defaults.eyebrow_angles_by_emotion": self._reload_eyebrow_angles,
+                "desktop_app.led_matrix": self._reload_matrix,
+                "desktop_app.llm": self._reload_llm_settings,
+            },
+            debug_cb=lambda msg: self.logger.log("SETTINGS", msg),
+        )
+        self.settings_watch_after_id = None
 
         self._build_style()
         self._build_layout()
         self._reset_stats()
         self._refresh_ports()
+        self.emotion_ticker.start()
+        self._schedule_settings_watch()
 
 
     def _build_style(self) -> None:
@@ -211,6 +255,10 @@ class NierDesktopApp:
         self._debug_row(self.debug_frame, 8, "Wenkbrauw Links")
         self._debug_row(self.debug_frame, 9, "Wenkbrauw Rechts")
         self._debug_row(self.debug_frame, 10, "LLM model (laatste)")
+        self._debug_row(self.debug_frame, 11, "TX delta")
+        self._debug_row(self.debug_frame, 12, "Geschiedenis")
+        self._debug_row(self.debug_frame, 13, "Antwoordcache")
+        self._debug_row(self.debug_frame, 14, "Instellingen")
 
         self.debug_frame.grid_remove()
 
@@ -314,6 +362,11 @@ class NierDesktopApp:
         ttk.Label(llm_frame, textvariable=self.llm_action_var, wraplength=340).grid(
             row=1, column=1, sticky="w", padx=(8, 0)
         )
+        ttk.Label(llm_frame, text="Model").grid(row=2, column=0, sticky="w")
+        self.llm_load_var = tk.StringVar(value="Niet geladen")
+        ttk.Label(llm_frame, textvariable=self.llm_load_var, wraplength=340).grid(
+            row=2, column=1, sticky="w", padx=(8, 0)
+        )
 
         emotions_frame = ttk.Labelframe(status_frame, text="Emotie statistieken", style="Section.TLabelframe")
         emotions_frame.grid(row=2, column=0, sticky="ew", pady=(0, 8))
@@ -383,40 +436,90 @@ class NierDesktopApp:
         self._start_loading_animation()
         self._set_debug("Laatste TX", f"Lokaal bericht: {message}")
         self.logger.log("USER_MSG", message)
-        threading.Thread(target=self._process_message_thread, args=(message,), daemon=True).start()
+        # A newer message supersedes one that is still queued or generating.
+        self.llm.scheduler.submit(
+            lambda request: self._process_message_thread(message, request),
+            session="chat",
+            priority=PRIORITY_CHAT,
+            timeout_s=LLM_REQUEST_TIMEOUT_S,
+            on_done=self._on_message_request_done,
+        )
 
 
-    def _process_message_thread(self, message: str) -> None:
+    def _process_message_thread(self, message: str, request=None) -> None:
         try:
             self._queue_llm_status("Busy", "Intent controleren")
-            response = self._handle_basic_intent(message)
+            intents = self.intent_router.match(message)
+            response = self._handle_basic_intent(intents)
             llm_used = False
             if response is None:
                 self._queue_llm_status("Busy", "LLM antwoord genereren")
-                history = list(self.conversation_history)
-                response = self.llm.generate_response(message, history=history, emotions=self.emotion_values)
+                history = self.conversation_history.lines()
+                response = self.llm.generate_response(
+                    message,
+                    history=history,
+                    emotions=self.emotion_values,
+                    on_partial=self._queue_partial_response,
+                    request=request,
+                    intents=intents,
+                )
                 llm_used = True
+            if request is not None and request.should_stop():
+                return
             response = self._normalize_robot_text(response)
             temp_history = list(self.recent_messages)
             temp_history.append(f"Gebruiker: {message}")
             temp_history.append(f"Robot: {response}")
             context_text = " ".join(temp_history[-3:])
-            self._queue_llm_status("Busy", "Emoties analyseren")
-            sentimentscore = self.llm.sentiment_score(context_text)
-            emotions = self.emotions.compute(context_text, sentimentscore)
-            self._queue_llm_status("Busy", "Antwoord tonen")
-            self.root.after(0, lambda: self._apply_response(message, response, emotions, llm_used))
+            # Per-line matches are cached, so only the new reply is scanned here.
+            context_intents = self.intent_router.match_all(temp_history[-3:])
+            self.root.after(0, lambda: self._apply_response(message, response, llm_used))
+            # Sentiment runs on its own worker; the reply is already visible while it scores.
+            self.llm.submit_sentiment(
+                context_text,
+                lambda score: self.root.after(
+                    0, lambda: self._apply_emotions(context_text, score, context_intents)
+                ),
+            )
         except Exception as exc:
             self.logger.log("ERROR", f"Message verwerking faalde: {exc}")
             self.root.after(0, self._handle_processing_error)
 
 
-    def _apply_response(self, message: str, response: str, emotions: dict, llm_used: bool = True) -> None:
+    def _on_message_request_done(self, request) -> None:
+        if request.state == REQUEST_EXPIRED:
+            self.root.after(0, self._handle_request_expired)
+
+    def _handle_request_expired(self) -> None:
+        self._stop_loading_animation()
+        self.response_label.configure(text="Geen antwoord binnen de tijd.")
+        self._set_llm_status("Idle", "Verzoek verlopen")
+
+    def _queue_partial_response(self, partial: str) -> None:
+        self.root.after(0, lambda: self._show_partial_response(partial))
+
+    def _show_partial_response(self, partial: str) -> None:
+        # Show finished clauses while the model keeps generating; _apply_response replaces them.
+        text = self._normalize_robot_text(partial)
+        if not text:
+            return
+        self._stop_loading_animation()
+        self.response_label.configure(text=text)
+        self._update_lcd(text)
+        self._set_debug("LCD regel 1", self.lcd_line1.cget("text"))
+        self._set_debug("LCD regel 2", self.lcd_line2.cget("text"))
+        if self.connected and self.serial.serial_port:
+            self._send_outputs([f"LCD:{self._truncate_for_serial(text)}"])
+
+
+    def _apply_response(self, message: str, response: str, llm_used: bool = True) -> None:
         self._stop_loading_animation()
         self.response_label.configure(text=response)
         self._set_debug("Antwoord (PC)", response)
         self.logger.log("ROBOT_MSG", response)
         model_name = getattr(self.llm, "loaded_model_name", "").strip() if llm_used else ""
+        if llm_used and self.llm.last_response_cached:
+            model_name = "cache"
         if llm_used and model_name:
             self._set_debug("LLM model (laatste)", model_name)
             self.logger.log("LLM_MODEL", model_name)
@@ -432,44 +535,67 @@ class NierDesktopApp:
         self.recent_messages.append(f"Robot: {response}")
         self.conversation_history.append(f"Gebruiker: {message}")
         self.conversation_history.append(f"Robot: {response}")
+        history = self.conversation_history
+        self._set_debug("Geschiedenis", f"{len(history)} regels / ~{history.token_count()} tokens")
+        if self.llm.response_cache is not None:
+            hits, misses, size = self.llm.response_cache.stats()
+            self._set_debug("Antwoordcache", f"{hits} hits / {misses} missers ({size} items)")
+
+        if self.connected and self.serial.serial_port:
+            if self._send_outputs([f"LCD:{self._truncate_for_serial(response)}"]):
+                self._set_telemetry("Laatste Commando", "LCD")
+        self._set_llm_status("Busy", "Emoties analyseren")
+
+
+    def _apply_emotions(self, context_text: str, sentimentscore: int, intents=None) -> None:
+        emotions = self.emotions.compute(context_text, sentimentscore, intents=intents)
+        self.emotion_ticker.mark_emitted(emotions)
+        self._show_emotions(emotions)
+        self._set_llm_status("Idle", "Wacht op gebruiker")
+
+    def _on_emotion_tick(self, emotions: dict) -> None:
+        # Called from the ticker thread.
+        self.root.after(0, lambda: self._show_emotions(emotions, from_tick=True))
 
+    def _show_emotions(self, emotions: dict, from_tick: bool = False) -> None:
         for name, value in emotions.items():
             self._set_emotion(name, value)
 
         if self.connected and self.serial.serial_port:
-            self._send_line(f"LCD:{self._truncate_for_serial(response)}")
+            commands = []
             dominant = max(EMOTIONS, key=lambda name: emotions.get(name, 0))
             dominant_intensity = int(emotions.get(dominant, 0))
             browmap_cmd = browmap_command_for_emotion(dominant, EMOTIONS, self.eyebrow_angles)
             if browmap_cmd:
-                self._send_line(browmap_cmd)
-            for matrix_cmd in matrix_commands_for_emotion(dominant, self.matrix_patterns):
-                self._send_line(matrix_cmd)
+                commands.append(browmap_cmd)
             rgb = self.emotion_rgb_map.get(dominant, (0, 0, 0))
-            self._send_line(f"RGB:{rgb[0]},{rgb[1]},{rgb[2]}")
+            commands.append(f"RGB:{rgb[0]},{rgb[1]},{rgb[2]}")
             if self.emotion_buzzer_enabled_var.get():
                 pitch = int(self.emotion_buzzer_pitch_map.get(dominant, 0))
                 if pitch > 0 and dominant_intensity >= self.emotion_buzzer_min_intensity:
-                    self._send_line(f"BUZZER:ON,{pitch}")
+                    commands.append(f"BUZZER:ON,{pitch}")
                 else:
-                    self._send_line("BUZZER:OFF")
+                    commands.append("BUZZER:OFF")
             else:
-                self._send_line("BUZZER:OFF")
-            self._send_line(f"EMO:{self._serialize_emotions(emotions)}")
-            self._set_telemetry("Laatste Commando", "LCD/EMO/RGB/BUZZER")
-        else:
+                commands.append("BUZZER:OFF")
+            commands.append(f"EMO:{self._serialize_emotions(emotions)}")
+            sent = self._send_outputs(commands)
+            heads = []
+            for line in sent:
+                head = line.split(":", 1)[0]
+                if head not in heads:
+                    heads.append(head)
+            # MATRIX frames are streamed by the animator thread, outside the shadow.
+            if self.matrix_animator.play(dominant):
+                heads.append("MATRIX")
+            if heads or not from_tick:
+                self._set_telemetry("Laatste Commando", "/".join(heads) if heads else "Geen wijziging")
+        elif not from_tick:
             self._set_telemetry("Laatste Commando", "-")
-        self._set_llm_status("Idle", "Wacht op gebruiker")
-
 
-    def _handle_basic_intent(self, message: str) -> str | None:
-        lowered = message.lower()
 
-        if any(phrase in lowered for phrase in ["hoe laat", "tijd is het", "hoe laat is het", "tijd?"]):
-            now = datetime.now().strftime("%H:%M:%S")
-            return f"Het is {now}."
-        
-        return None
+    def _handle_basic_intent(self, intents: IntentMatch) -> str | None:
+        return self.intent_router.reply_for(intents)
 
 
     def _update_lcd(self, text: str) -> None:
@@ -524,7 +650,7 @@ class NierDesktopApp:
         self._set_debug("LCD regel 2", line2)
         self.response_label.configure(text=f"Antwoord wordt berekend{dots}")
         if self.connected and self.serial.serial_port:
-            self._send_line(f"LCD:{line1}{line2}")
+            self._send_outputs([f"LCD:{line1}{line2}"])
             self._set_telemetry("Laatste Commando", "LCD loading")
         self.loading_animation_after_id = self.root.after(400, self._tick_loading_animation)
 
@@ -616,6 +742,9 @@ class NierDesktopApp:
         self.logger.log("CONNECT_OK", f"Verbonden met {port}")
 
         self._reset_stats()
+        self.device_shadow.clear()
+        self.matrix_animator.reset()
+        self.matrix_animator.start()
         self._send_line("HELLO")
         # Keep sonar sensors active; the checkbox controls head sweep only.
         self._send_line("SONAR:ON")
@@ -638,6 +767,7 @@ class NierDesktopApp:
         self.connection_status.configure(text="Status: Offline")
         self.logger.log("DISCONNECT", "Verbinding verbroken")
         self._stop_pan_auto_loop()
+        self.matrix_animator.stop()
         self._safe_stop()
 
 
@@ -649,8 +779,19 @@ class NierDesktopApp:
     def _send_line(self, line: str) -> None:
         self.serial.send_line(line)
 
+    def _send_outputs(self, lines: list[str]) -> list[str]:
+        # Output commands (LCD/BROWMAP/MATRIX/RGB/BUZZER/EMO) are only sent when they differ from the shadow.
+        changed = self.device_shadow.filter(lines)
+        for line in changed:
+            self._send_line(line)
+        shadow = self.device_shadow
+        self._set_debug("TX delta", f"{shadow.sent_count} verstuurd / {shadow.skipped_count} overgeslagen")
+        return changed
+
     def _send_reset(self) -> None:
         self._perform_full_reset()
+        self.device_shadow.clear()
+        self.matrix_animator.reset()
         if not self.connected or not self.serial.serial_port:
             self._set_debug("Laatste TX", "RESET (lokaal)")
             return
@@ -780,7 +921,7 @@ class NierDesktopApp:
 
     def _on_emotion_buzzer_toggle(self) -> None:
         if not self.emotion_buzzer_enabled_var.get() and self.connected and self.serial.serial_port:
-            self._send_line("BUZZER:OFF")
+            self._send_outputs(["BUZZER:OFF"])
             self.logger.log("TX", "BUZZER:OFF")
 
 
@@ -788,34 +929,31 @@ class NierDesktopApp:
         if not self.connected or not self.serial.serial_port:
             return
         try:
-            while self.serial.serial_port.in_waiting:
-                raw = self.serial.serial_port.readline()
-                if not raw:
-                    break
-                try:
-                    line = raw.decode("utf-8", errors="ignore").strip()
-                except UnicodeDecodeError:
-                    continue
-                if line:
-                    try:
-                        self._handle_line(line)
-                    except Exception as exc:
-                        self.logger.log("HANDLE_ERR", f"{exc} | line={line}")
-                        self.logger.log("HANDLE_TRACE", traceback.format_exc())
+            frames = self.serial.poll_frames(SERIAL_RX_BATCH_SIZE)
         except serial.SerialException as exc:
             self.connection_status.configure(text=f"Status: Verbroken - {exc}")
             self.logger.log("SERIAL_ERR", str(exc))
             self._disconnect()
             return
+        for frame in frames:
+            try:
+                self._handle_frame(frame)
+            except Exception as exc:
+                self.logger.log("HANDLE_ERR", f"{exc} | line={frame.line}")
+                self.logger.log("HANDLE_TRACE", traceback.format_exc())
 
-        self.root.after(100, self._poll_serial)
+        # Drain a backlog right away instead of waiting a full poll interval.
+        delay = 1 if self.serial.has_pending_frames() else SERIAL_POLL_INTERVAL_MS
+        self.root.after(delay, self._poll_serial)
 
 
-    def _handle_line(self, line: str) -> None:
-        self._set_debug("Laatste RX", line)
-        self.logger.log("RX", line)
+    def _handle_frame(self, frame: SerialFrame) -> None:
+        self._set_debug("Laatste RX", frame.line)
+        self.logger.log("RX", frame.line)
+        kind = frame.kind
+        parts = frame.fields
 
-        if line == "READY":
+        if kind == "READY":
             if self.navigation_enabled and not self.sonar_enabled:
                 mode = "AUTO (ON) - HEAD STILL"
             else:
@@ -823,14 +961,14 @@ class NierDesktopApp:
             self._set_telemetry("Navigatie Modus", mode)
             return
 
-        if line.startswith("ACK:"):
-            self._set_telemetry("Laatste Commando", line[4:])
+        if kind == "ACK":
+            self._set_telemetry("Laatste Commando", parts[0])
+            if parts[0] == "RESET":
+                self.device_shadow.clear()
+                self.matrix_animator.reset()
             return
 
-        if line.startswith("STAT:"):
-            payload = line[5:]
-            parts = payload.split(",")
-
+        if kind == "STAT":
             if len(parts) >= 5:
                 sonar_left = self._safe_int(parts[0])
                 sonar_right = self._safe_int(parts[1])
@@ -839,7 +977,11 @@ class NierDesktopApp:
                 self._set_telemetry("Sonar Rechts", f"{sonar_right} cm")
                 self._set_telemetry("Dichtste Afstand", f"{closest} cm")
                 self._update_hunger_from_sonar_pulse(sonar_left, sonar_right, closest)
-                self.battery_bar.configure(value=self._safe_int(parts[3]))
+                battery = self._safe_int(parts[3])
+                self.battery_bar.configure(value=battery)
+                self.emotion_ticker.post_sensors(
+                    self._closest_valid_distance_cm(sonar_left, sonar_right, closest), battery
+                )
                 if self.navigation_enabled and not self.sonar_enabled:
                     nav_mode = "AUTO (ON) - HEAD STILL"
                 else:
@@ -849,10 +991,7 @@ class NierDesktopApp:
 
             return
 
-        if line.startswith("OUT:"):
-            payload = line[4:]
-            parts = payload.split(",")
-
+        if kind == "OUT":
             if len(parts) >= 6:
                 rgb = f"{parts[0]},{parts[1]},{parts[2]}"
                 buzzer = "Aan" if parts[3] == "1" else "Uit"
@@ -866,12 +1005,12 @@ class NierDesktopApp:
                 self._set_debug("LCD regel 2", lcd[16:32].ljust(16))
                 self._update_lcd(lcd)
                 self._set_telemetry("RGB Status", rgb)
+                rgb_values = (self._safe_int(parts[0]), self._safe_int(parts[1]), self._safe_int(parts[2]))
+                self.device_shadow.confirm_out(rgb_values, parts[3] == "1", matrix, lcd)
                 
             return
 
-        if line.startswith("BROW:"):
-            payload = line[5:]
-            parts = payload.split(",")
+        if kind == "BROW":
             if len(parts) >= 2:
                 left = self._safe_int(parts[0])
                 right = self._safe_int(parts[1])
@@ -879,12 +1018,10 @@ class NierDesktopApp:
                 self._set_telemetry("Wenkbrauw Rechts", f"{right}°")
                 self._set_debug("Wenkbrauw Links", f"{left}°")
                 self._set_debug("Wenkbrauw Rechts", f"{right}°")
+                self.device_shadow.confirm_brow(left, right)
             return
         
-        if line.startswith("EMO:"):
-            payload = line[4:]
-            parts = payload.split(",")
-
+        if kind == "EMO":
             if len(parts) >= 8:
                 for name, value in zip(EMOTIONS, parts[:8]):
                     self._set_emotion(name, self._safe_int(value))
@@ -902,7 +1039,8 @@ class NierDesktopApp:
             var.set(value)
 
     def _on_serial_tx_debug(self, msg: str) -> None:
-        self._set_debug("Laatste TX", msg)
+        # Also called from the matrix animator thread, so Tk updates go through the event loop.
+        self.root.after(0, lambda: self._set_debug("Laatste TX", msg))
         self.logger.log("TX", msg)
 
     def _on_llm_debug(self, msg: str) -> None:
@@ -922,6 +1060,21 @@ class NierDesktopApp:
     def _queue_llm_status(self, state: str, action: str) -> None:
         self.root.after(0, lambda: self._set_llm_status(state, action))
 
+    def _on_llm_load_state(self, state: str, detail: str) -> None:
+        self.logger.log("LLM_LOAD", f"{state} {detail}".strip())
+        self.root.after(0, lambda: self._set_llm_load_state(state, detail))
+
+    def _set_llm_load_state(self, state: str, detail: str) -> None:
+        if state == LOAD_READY:
+            self.llm_load_var.set(f"READY ({detail})" if detail else "READY")
+        elif state == LOAD_FAILED:
+            self.llm_load_var.set("FAILED - lokale antwoorden")
+        else:
+            self.llm_load_var.set(f"{state} (lokale antwoorden)")
+            return
+        if not self.loading_animation_active:
+            self._set_llm_status("Idle", "Wacht op gebruiker")
+
     def _handle_processing_error(self) -> None:
         self._stop_loading_animation()
         self.response_label.configure(text="Er ging iets mis.")
@@ -976,11 +1129,9 @@ class NierDesktopApp:
         self.last_sonar_sample_at = now
 
     def _decrease_hunger_from_sonar_pulse(self, drop_cm: int, closest_cm: int) -> None:
-        current_hunger = max(0, min(100, int(self.emotions.stat_levels.get("Hunger", 0))))
-        new_hunger = max(0, current_hunger - self.sonar_pulse_hunger_drop)
+        current_hunger, new_hunger = self.emotions.nudge("Hunger", -self.sonar_pulse_hunger_drop)
         if new_hunger == current_hunger:
             return
-        self.emotions.stat_levels["Hunger"] = new_hunger
         self._set_emotion("Hunger", new_hunger)
         self.logger.log("HUNGER", f"Sonar pulse ({drop_cm}cm drop, closest {closest_cm}cm) -> {current_hunger}->{new_hunger}")
 
@@ -999,9 +1150,12 @@ class NierDesktopApp:
 
     def _reset_stats(self) -> None:
         self.emotions.reset()
+        self.emotion_ticker.post_sensors(None, None)
+        values = self.emotions.values()
+        self.emotion_ticker.mark_emitted(values)
 
         for name in EMOTIONS:
-            self._set_emotion(name, 0)
+            self._set_emotion(name, values.get(name, 0))
 
         self._set_telemetry("Sonar Links", "0 cm")
         self._set_telemetry("Sonar Rechts", "0 cm")
@@ -1030,6 +1184,8 @@ class NierDesktopApp:
         self._set_debug("Wenkbrauw Links", "-")
         self._set_debug("Wenkbrauw Rechts", "-")
         self._set_debug("LLM model (laatste)", "-")
+        self._set_debug("TX delta", "-")
+        self._set_debug("Geschiedenis", "-")
 
         if self.lcd_scroll_after_id:
             self.root.after_cancel(self.lcd_scroll_after_id)
@@ -1047,8 +1203,60 @@ class NierDesktopApp:
         self.last_hunger_pulse_at = 0.0
 
 
+    def _schedule_settings_watch(self) -> None:
+        if SETTINGS_WATCH_INTERVAL_MS <= 0:
+            return
+        self.settings_watch_after_id = self.root.after(SETTINGS_WATCH_INTERVAL_MS, self._poll_settings)
+
+    def _poll_settings(self) -> None:
+        changed = self.settings_watcher.poll()
+        if changed:
+            self.logger.log("SETTINGS", f"Herladen: {', '.join(changed)}")
+            self._set_debug("Instellingen", f"herladen ({self.settings_watcher.reloads}x)")
+            if any(path != "desktop_app.llm" for path in changed):
+                # Show the current emotion with the new tables; the shadow only sends what differs.
+                self._show_emotions(self.emotions.values(), from_tick=True)
+        self._schedule_settings_watch()
+
+    def _reload_rgb_map(self, _value, _previous) -> None:
+        self.emotion_rgb_map = load_emotion_rgb_map(EMOTIONS)
+
+    def _reload_buzzer_map(self, _value, _previous) -> None:
+        self.emotion_buzzer_pitch_map = load_emotion_buzzer_pitch_map(EMOTIONS)
+
+    def _reload_buzzer_min_intensity(self, value, _previous) -> None:
+        self.emotion_buzzer_min_intensity = max(0, min(100, int(value)))
+
+    def _reload_eyebrow_angles(self, _value, _previous) -> None:
+        self.eyebrow_angles = load_eyebrow_angles(EMOTIONS)
+
+    def _reload_matrix(self, _value, _previous) -> None:
+        invalidate_matrix_command_cache()
+        patterns = load_led_matrix_patterns(EMOTIONS)
+        animations = load_led_matrix_animations(EMOTIONS, patterns)
+        self.matrix_patterns = patterns
+        self.matrix_animator.set_animations(animations)
+
+    def _reload_llm_settings(self, value, previous) -> None:
+        self.llm.apply_sampling(value or {})
+        sampling_keys = set(self.llm.sampling)
+        old, new = previous or {}, value or {}
+        restart_keys = sorted(
+            key for key in set(old) | set(new) if key not in sampling_keys and old.get(key) != new.get(key)
+        )
+        if restart_keys:
+            self.logger.log("SETTINGS", f"Pas actief na herstart: {', '.join(restart_keys)}")
+
     def _on_close(self) -> None:
+        if self.settings_watch_after_id is not None:
+            self.root.after_cancel(self.settings_watch_after_id)
+            self.settings_watch_after_id = None
         self._stop_pan_auto_loop()
+        self.emotion_ticker.stop()
+        self.matrix_animator.stop()
+        if self.llm.response_cache is not None:
+            self.llm.response_cache.save()
+        self.llm.close()
         self._safe_stop()
         self.logger.log("APP_STOP", "Desktop app afgesloten")
         self.root.destroy()
@@ -1116,5 +1324,7 @@ class AppLogger:
 def run_app() -> None:
     root = tk.Tk()
     app = NierDesktopApp(root)
+    # Start loading the model right away so the first message doesn't pay for it.
+    root.after(0, app.llm.preload)
     root.protocol("WM_DELETE_WINDOW", app._on_close)
     root.mainloop()
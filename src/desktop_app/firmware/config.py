@@ -1,10 +1,12 @@
-from settings_loader import load_settings
+from settings_loader import settings_store
 
 
-_SETTINGS = load_settings()
+# Shared, read-only snapshot; the module constants below are derived from it once at import.
+_SETTINGS = settings_store().snapshot()
 _DESKTOP = _SETTINGS.get("desktop_app", {})
 _LLM = _DESKTOP.get("llm", {})
 _SERIAL = _DESKTOP.get("serial", {})
+_MATRIX_ANIMATION = _DESKTOP.get("led_matrix", {}).get("animation", {})
 
 EMOTIONS = list(
     _DESKTOP.get(
@@ -47,11 +49,61 @@ LLM_MIN_NEW_TOKENS = int(_LLM.get("min_new_tokens", 1))
 LLM_REPETITION_PENALTY = float(_LLM.get("repetition_penalty", 1.08))
 LLM_TEMPERATURE = float(_LLM.get("temperature", 0.7))
 LLM_TOP_P = float(_LLM.get("top_p", 0.9))
+LLM_PREFIX_CACHE = bool(_LLM.get("prefix_cache", True))
+LLM_HISTORY_TOKEN_BUDGET = int(_LLM.get("history_token_budget", 384))
+LLM_LOAD_PROFILE = str(_LLM.get("load_profile", "auto")).strip().lower()
+LLM_ASSISTED_GENERATION = bool(_LLM.get("assisted_generation", False))
+LLM_ASSISTANT_MODEL_NAME = str(_LLM.get("assistant_model_name", "")).strip()
+LLM_QUEUE_SIZE = int(_LLM.get("queue_size", 4))
+LLM_REQUEST_TIMEOUT_S = float(_LLM.get("request_timeout_s", 90.0))
+LLM_RESPONSE_CACHE = bool(_LLM.get("response_cache", True))
+LLM_RESPONSE_CACHE_SIZE = int(_LLM.get("response_cache_size", 512))
+LLM_RESPONSE_CACHE_TTL_S = float(_LLM.get("response_cache_ttl_s", 7 * 24 * 3600))
+LLM_RESPONSE_CACHE_VARIANTS = int(_LLM.get("response_cache_variants", 3))
+LLM_RESPONSE_CACHE_EXPLORE = float(_LLM.get("response_cache_explore", 0.2))
+LLM_RESPONSE_CACHE_PATH = str(_LLM.get("response_cache_path", "")).strip()
+LLM_BACKEND = str(_LLM.get("backend", "process")).strip().lower()
+LLM_BACKEND_URL = str(_LLM.get("backend_url", "http://127.0.0.1:8080/v1")).strip()
+LLM_BACKEND_MODEL = str(_LLM.get("backend_model", "")).strip()
+LLM_BACKEND_API_KEY = str(_LLM.get("backend_api_key", "")).strip()
+LLM_BACKEND_TIMEOUT_S = float(_LLM.get("backend_timeout_s", 60.0))
+LLM_ONNX_MODEL_DIR = str(_LLM.get("onnx_model_dir", "")).strip()
+LLM_ONNX_SENTIMENT_DIR = str(_LLM.get("onnx_sentiment_dir", "")).strip()
+LLM_WORKER_BACKEND = str(_LLM.get("worker_backend", "transformers")).strip().lower()
+LLM_WORKER_HEALTH_INTERVAL_S = float(_LLM.get("worker_health_interval_s", 5.0))
+LLM_WORKER_PING_TIMEOUT_S = float(_LLM.get("worker_ping_timeout_s", 20.0))
 
 SERIAL_BAUD = int(_SERIAL.get("baud", 9600))
 SERIAL_TIMEOUT = float(_SERIAL.get("timeout", 0.1))
+SERIAL_RX_QUEUE_SIZE = int(_SERIAL.get("rx_queue_size", 512))
+SERIAL_RX_BATCH_SIZE = int(_SERIAL.get("rx_batch_size", 64))
+SERIAL_POLL_INTERVAL_MS = int(_SERIAL.get("poll_interval_ms", 30))
+SERIAL_BINARY_PROTOCOL = bool(_SERIAL.get("binary_protocol", True))
+LED_MATRIX_MAX_BYTES_PER_S = int(_MATRIX_ANIMATION.get("max_bytes_per_s", 240))
+LED_MATRIX_IDLE_BLINK = bool(_MATRIX_ANIMATION.get("idle_blink", True))
+LED_MATRIX_BLINK_INTERVAL_MS = int(_MATRIX_ANIMATION.get("blink_interval_ms", 4500))
+LED_MATRIX_BLINK_JITTER_MS = int(_MATRIX_ANIMATION.get("blink_jitter_ms", 2000))
+LED_MATRIX_BLINK_DURATION_MS = int(_MATRIX_ANIMATION.get("blink_duration_ms", 150))
 PAN_AUTO_SPEED_MS = int(_DESKTOP.get("pan_auto_speed_ms", 120))
+SETTINGS_WATCH_INTERVAL_MS = int(_DESKTOP.get("settings_watch_interval_ms", 1000))
 EMOTION_BUZZER_ENABLED = bool(_DESKTOP.get("emotion_buzzer_enabled", True))
 EMOTION_BUZZER_MIN_INTENSITY = int(_DESKTOP.get("emotion_buzzer_min_intensity", 35))
 
+INTENTS = list(_DESKTOP.get("intents", []))
+_EMOTION_MODEL = _DESKTOP.get("emotion_model", {})
+EMOTION_BASELINE = int(_EMOTION_MODEL.get("baseline", 10))
+EMOTION_HALF_LIFE_S = float(_EMOTION_MODEL.get("half_life_s", 90.0))
+EMOTION_HALF_LIFE_S_BY_EMOTION = {
+    str(name): float(value) for name, value in dict(_EMOTION_MODEL.get("half_life_s_by_emotion", {})).items()
+}
+EMOTION_DRIVE_PER_S = {str(name): float(value) for name, value in dict(_EMOTION_MODEL.get("drive_per_s", {})).items()}
+EMOTION_TICK_HZ = float(_EMOTION_MODEL.get("tick_hz", 8.0))
+EMOTION_EMIT_THRESHOLD = int(_EMOTION_MODEL.get("emit_threshold", 3))
+EMOTION_EMIT_MIN_INTERVAL_S = float(_EMOTION_MODEL.get("emit_min_interval_s", 0.5))
+EMOTION_PRESENCE_CM = int(_EMOTION_MODEL.get("presence_cm", 40))
+EMOTION_PRESENCE_EMOTION = str(_EMOTION_MODEL.get("presence_emotion", "Curiosity"))
+EMOTION_PRESENCE_LEVEL = int(_EMOTION_MODEL.get("presence_level", 55))
+EMOTION_LOW_BATTERY_PCT = int(_EMOTION_MODEL.get("low_battery_pct", 20))
+EMOTION_LOW_BATTERY_EMOTION = str(_EMOTION_MODEL.get("low_battery_emotion", "Fatigue"))
+EMOTION_LOW_BATTERY_LEVEL = int(_EMOTION_MODEL.get("low_battery_level", 80))
 CONTROL_LAB_DEFAULTS = dict(_DESKTOP.get("control_lab", {}))
@@ -0,0 +1,126 @@
+import re
+import threading
+from collections import deque
+
+from config import LLM_HISTORY_TOKEN_BUDGET
+
+
+SUMMARY_MAX_TOPICS = 10
+# After an overflow, trim down to this share of the budget so the prompt prefix stays stable for a few turns.
+_TRIM_TARGET = 0.75
+
+_STOPWORDS = {
+    "alles", "altijd", "andere", "beetje", "daar", "dacht", "dan", "dat", "deze", "die", "dit", "doen", "echt",
+    "eens", "gaan", "gaat", "geen", "goed", "graag", "heb", "hebben", "heeft", "hier", "hoe", "iets", "jij",
+    "jouw", "kan", "kunnen", "maar", "meer", "mij", "mijn", "misschien", "moet", "naar", "niet", "niets",
+    "noch", "nog", "omdat", "ook", "over", "veel", "voor", "waar", "wanneer", "want", "waarom", "wat",
+    "welke", "wie", "wil", "willen", "zeg", "zeggen", "zijn", "zou", "zullen",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough subword estimate for Dutch text when no tokenizer is loaded yet.
+    return max(1, (len(text.split()) * 4 + 2) // 3)
+
+
+class ConversationHistory:
+    """Recent turns kept verbatim plus a short summary of evicted ones, within a token budget."""
+
+    def __init__(self, token_budget: int = LLM_HISTORY_TOKEN_BUDGET, count_tokens=None) -> None:
+        self.token_budget = max(32, int(token_budget))
+        self.count_tokens = count_tokens
+        self.evicted = 0
+        self._lock = threading.Lock()
+        # Entries are [line, tokens, exact]; exact marks counts that came from the real tokenizer.
+        self._turns = deque()
+        self._total = 0
+        self._topics = deque(maxlen=SUMMARY_MAX_TOPICS)
+        self._summary = ""
+        self._summary_tokens = 0
+
+    def append(self, line: str) -> None:
+        tokens, exact = self._count(line)
+        with self._lock:
+            self._turns.append([line, tokens, exact])
+            self._total += tokens
+
+    def clear(self) -> None:
+        with self._lock:
+            self._turns.clear()
+            self._total = 0
+            self._topics.clear()
+            self._summary = ""
+            self._summary_tokens = 0
+
+    def lines(self) -> list[str]:
+        with self._lock:
+            self._recount_estimates_locked()
+            self._enforce_budget_locked()
+            out = [entry[0] for entry in self._turns]
+            if self._summary:
+                out.insert(0, self._summary)
+            return out
+
+    def token_count(self) -> int:
+        with self._lock:
+            return self._total + self._summary_tokens
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def _count(self, text: str) -> tuple[int, bool]:
+        if self.count_tokens is not None:
+            try:
+                tokens = self.count_tokens(text)
+            except Exception:
+                tokens = None
+            if tokens is not None:
+                return max(1, int(tokens)), True
+        return estimate_tokens(text), False
+
+    def _recount_estimates_locked(self) -> None:
+        if self.count_tokens is None:
+            return
+        for entry in self._turns:
+            if entry[2]:
+                continue
+            tokens, exact = self._count(entry[0])
+            if not exact:
+                # Tokenizer still unavailable; keep the estimates.
+                return
+            self._total += tokens - entry[1]
+            entry[1], entry[2] = tokens, True
+        if self._summary:
+            self._summary_tokens = self._count(self._summary)[0]
+
+    def _enforce_budget_locked(self) -> None:
+        if self._total + self._summary_tokens <= self.token_budget:
+            return
+        target = int(self.token_budget * _TRIM_TARGET)
+        folded = False
+        # Keep at least the latest exchange verbatim, even when it alone exceeds the budget.
+        while len(self._turns) > 2 and self._total + self._summary_tokens > target:
+            line, tokens, _exact = self._turns.popleft()
+            self._total -= tokens
+            self.evicted += 1
+            self._fold_into_summary(line)
+            folded = True
+        while folded and len(self._turns) > 2 and not self._turns[0][0].startswith("Gebruiker:"):
+            # Don't start the verbatim part halfway through an exchange.
+            line, tokens, _exact = self._turns.popleft()
+            self._total -= tokens
+            self.evicted += 1
+        if folded:
+            self._summary = ("Eerder besproken: " + ", ".join(self._topics) + ".") if self._topics else ""
+            self._summary_tokens = self._count(self._summary)[0] if self._summary else 0
+
+    def _fold_into_summary(self, line: str) -> None:
+        speaker, _, text = line.partition(":")
+        if speaker.strip() != "Gebruiker":
+            return
+        for word in re.findall(r"[a-zA-ZÀ-ſ]{4,}", text.lower()):
+            if word in _STOPWORDS:
+                continue
+            if word in self._topics:
+                self._topics.remove(word)
+            self._topics.append(word)
@@ -0,0 +1,118 @@
+import time
+
+
+# Telemetry that arrives this soon after a send may still describe the old state.
+CONFIRM_GRACE_S = 0.6
+
+_FIRMWARE_EMO_NAMES = [
+    "HAPPINESS",
+    "FATIGUE",
+    "HUNGER",
+    "SADNESS",
+    "ANXIETY",
+    "AFFECTION",
+    "CURIOSITY",
+    "FRUSTRATION",
+]
+
+
+def output_key(line: str) -> str:
+    head, _, payload = line.partition(":")
+    if head in ("MATRIX", "BROWMAP"):
+        return f"{head}:{payload.split(',', 1)[0]}"
+    return head
+
+
+def _firmware_lcd_text(text: str) -> str:
+    # Mirrors updateLCD() in the firmware so telemetry can be compared verbatim.
+    cleaned = text.replace(",", " ").replace("\n", " ").replace("\r", " ").strip()
+    return (cleaned or " ")[:128]
+
+
+class DeviceShadow:
+    """Last output command per robot output, used to send only what changed."""
+
+    def __init__(self) -> None:
+        self.lines: dict[str, str] = {}
+        self.sent_at: dict[str, float] = {}
+        self.sent_count = 0
+        self.skipped_count = 0
+
+    def filter(self, lines: list[str]) -> list[str]:
+        now = time.monotonic()
+        changed = []
+        for line in lines:
+            key = output_key(line)
+            if self.lines.get(key) == line:
+                self.skipped_count += 1
+                continue
+            self.lines[key] = line
+            self.sent_at[key] = now
+            changed.append(line)
+        emo_line = self.lines.get("EMO")
+        if emo_line in lines and emo_line not in changed and any(line.startswith("BROWMAP:") for line in changed):
+            # The firmware only applies a new eyebrow map when the next EMO arrives.
+            changed.append(emo_line)
+            self.sent_at["EMO"] = now
+            self.skipped_count -= 1
+        self.sent_count += len(changed)
+        return changed
+
+    def invalidate(self, key: str) -> None:
+        self.lines.pop(key, None)
+        self.sent_at.pop(key, None)
+
+    def clear(self) -> None:
+        self.lines.clear()
+        self.sent_at.clear()
+
+    def confirm_out(self, rgb: tuple[int, int, int], buzzer_on: bool, matrix_emotion: str, lcd: str) -> None:
+        if self._settled("RGB") and self.lines["RGB"] != f"RGB:{rgb[0]},{rgb[1]},{rgb[2]}":
+            self.invalidate("RGB")
+        if self._settled("BUZZER") and self.lines["BUZZER"].startswith("BUZZER:ON") != buzzer_on:
+            self.invalidate("BUZZER")
+        if self._settled("EMO") and self._dominant_name() != matrix_emotion.strip().upper():
+            self.invalidate("EMO")
+        if self._settled("LCD") and _firmware_lcd_text(self.lines["LCD"][4:]) != lcd.strip():
+            self.invalidate("LCD")
+
+    def confirm_brow(self, left: int, right: int) -> None:
+        dominant = self._dominant_index()
+        if dominant is None or not self._settled("EMO"):
+            return
+        key = f"BROWMAP:{dominant}"
+        if not self._settled(key):
+            return
+        parts = self.lines[key].split(",")
+        if len(parts) >= 3 and (parts[1], parts[2]) != (str(left), str(right)):
+            self.invalidate(key)
+
+    def _settled(self, key: str) -> bool:
+        if key not in self.lines:
+            return False
+        return time.monotonic() - self.sent_at.get(key, 0.0) >= CONFIRM_GRACE_S
+
+    def _dominant_index(self) -> int | None:
+        line = self.lines.get("EMO")
+        if not line:
+            return None
+        values = []
+        for part in line[4:].split(","):
+            try:
+                values.append(int(part))
+            except ValueError:
+                values.append(0)
+        if not values:
+            return None
+        # Firmware keeps the first index on ties (strict > while scanning).
+        best = 0
+        for idx, value in enumerate(values):
+            if value > values[best]:
+                best = idx
+        return best
+
+    def _dominant_name(self) -> str:
+        index = self._dominant_index()
+        if index is None or index >= len(_FIRMWARE_EMO_NAMES):
+            return ""
+        return _FIRMWARE_EMO_NAMES[index]
@@ -1,4 +1,4 @@
-from settings_loader import load_settings
+from settings_loader import settings_store
 
 
 _DEFAULT_RGB = {
@@ -33,11 +33,8 @@ def _buzzer_for_emotions(emotions: list[str]) -> dict[str, int]:
 
 
 def load_emotion_rgb_map(emotions: list[str]) -> dict[str, tuple[int, int, int]]:
-    settings = load_settings()
-    raw = settings.get("desktop_app", {}).get("emotion_rgb_by_emotion", {})
+    raw = settings_store().get_dict("desktop_app.emotion_rgb_by_emotion")
     result = _rgb_for_emotions(emotions)
-    if not isinstance(raw, dict):
-        return result
     for emotion in emotions:
         value = raw.get(emotion)
         if isinstance(value, list) and len(value) >= 3:
@@ -52,11 +49,8 @@ def load_emotion_rgb_map(emotions: list[str]) -> dict[str, tuple[int, int, int]]
 
 
 def load_emotion_buzzer_pitch_map(emotions: list[str]) -> dict[str, int]:
-    settings = load_settings()
-    raw = settings.get("desktop_app", {}).get("emotion_buzzer_pitch_by_emotion", {})
+    raw = settings_store().get_dict("desktop_app.emotion_buzzer_pitch_by_emotion")
     result = _buzzer_for_emotions(emotions)
-    if not isinstance(raw, dict):
-        return result
     for emotion in emotions:
         value = raw.get(emotion)
         try:
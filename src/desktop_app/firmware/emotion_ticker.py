@@ -0,0 +1,106 @@
+import threading
+import time
+
+from config import (
+    EMOTION_EMIT_MIN_INTERVAL_S,
+    EMOTION_EMIT_THRESHOLD,
+    EMOTION_LOW_BATTERY_EMOTION,
+    EMOTION_LOW_BATTERY_LEVEL,
+    EMOTION_LOW_BATTERY_PCT,
+    EMOTION_PRESENCE_CM,
+    EMOTION_PRESENCE_EMOTION,
+    EMOTION_PRESENCE_LEVEL,
+    EMOTION_TICK_HZ,
+)
+
+
+class EmotionTicker:
+    """Steps the EmotionEngine at a fixed rate on a monotonic clock and emits only significant changes.
+
+    Sensor values are latched (newest wins) and folded in on the next tick; emit(values) is called
+    from the ticker thread when a value moved by at least the threshold or the dominant emotion changed.
+    """
+
+    def __init__(self, engine, emit, hz: float = EMOTION_TICK_HZ) -> None:
+        self.engine = engine
+        self.emit = emit
+        self.period = 1.0 / max(1.0, min(30.0, float(hz)))
+        self.threshold = max(1, int(EMOTION_EMIT_THRESHOLD))
+        self.min_interval = max(0.0, float(EMOTION_EMIT_MIN_INTERVAL_S))
+        self.ticks = 0
+        self.emits = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._running = False
+        self._closest_cm = None
+        self._battery_pct = None
+        self._emitted = engine.values()
+        self._emitted_at = 0.0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="emotion-ticker", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._running = False
+            thread = self._thread
+            self._thread = None
+        self._wake.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=1.0)
+
+    def post_sensors(self, closest_cm: int | None, battery_pct: int | None) -> None:
+        with self._lock:
+            self._closest_cm = closest_cm
+            self._battery_pct = battery_pct
+
+    def mark_emitted(self, values: dict) -> None:
+        # Values that were already shown and sent elsewhere (chat turn, reset).
+        with self._lock:
+            self._emitted = dict(values)
+            self._emitted_at = time.monotonic()
+
+    def _apply_sensors_locked(self) -> None:
+        closest, battery = self._closest_cm, self._battery_pct
+        if closest is not None and 0 < closest <= EMOTION_PRESENCE_CM:
+            self.engine.excite(EMOTION_PRESENCE_EMOTION, EMOTION_PRESENCE_LEVEL)
+        if battery is not None and 0 < battery <= EMOTION_LOW_BATTERY_PCT:
+            self.engine.excite(EMOTION_LOW_BATTERY_EMOTION, EMOTION_LOW_BATTERY_LEVEL)
+
+    def _significant_locked(self, values: dict) -> bool:
+        previous = self._emitted
+        if max(values, key=values.get, default="") != max(previous, key=previous.get, default=""):
+            return True
+        return any(abs(value - previous.get(name, 0)) >= self.threshold for name, value in values.items())
+
+    def _run(self) -> None:
+        next_tick = time.monotonic()
+        while True:
+            values = None
+            with self._lock:
+                if not self._running:
+                    return
+                self._apply_sensors_locked()
+                current = self.engine.step()
+                self.ticks += 1
+                now = time.monotonic()
+                if now - self._emitted_at >= self.min_interval and self._significant_locked(current):
+                    self._emitted = current
+                    self._emitted_at = now
+                    self.emits += 1
+                    values = current
+            if values is not None:
+                self.emit(values)
+            next_tick += self.period
+            now = time.monotonic()
+            if next_tick < now:
+                # Fell behind (suspend, busy machine): skip missed ticks, decay covers the gap.
+                next_tick = now + self.period
+            self._wake.wait(timeout=next_tick - now)
+            self._wake.clear()
@@ -1,45 +1,128 @@
-﻿from config import EMOTIONS
+﻿import math
+import threading
+import time
+from array import array
+
+from config import (
+    EMOTION_BASELINE,
+    EMOTION_DRIVE_PER_S,
+    EMOTION_HALF_LIFE_S,
+    EMOTION_HALF_LIFE_S_BY_EMOTION,
+    EMOTIONS,
+)
+from intent_router import IntentRouter
 
 
 class EmotionEngine:
-    def __init__(self) -> None:
-        self.stat_levels = {"Hunger": 0, "Fatigue": 0}
+    """Emotion state in fixed-order arrays indexed like EMOTIONS.
+
+    mood decays exponentially towards the baseline per elapsed second; drive (Hunger, Fatigue)
+    builds up per second until something satisfies it. An emotion shows the higher of the two.
+    """
+
+    def __init__(self, intent_router=None, emotions: list[str] | None = None, clock=time.monotonic) -> None:
+        self.intent_router = intent_router or IntentRouter()
+        self.names = list(EMOTIONS if emotions is None else emotions)
+        self.index = {name: idx for idx, name in enumerate(self.names)}
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._baseline = float(EMOTION_BASELINE)
+        half_lives = [EMOTION_HALF_LIFE_S_BY_EMOTION.get(name, EMOTION_HALF_LIFE_S) for name in self.names]
+        self._decay_rate = array("d", [math.log(2) / h if h > 0 else 0.0 for h in half_lives])
+        self._drive_rate = array("d", [EMOTION_DRIVE_PER_S.get(name, 0.0) for name in self.names])
+        # Intent name -> (emotion index, level, drive boost), compiled once from the intent table.
+        self._effects = {
+            intent: (self.index[emotion], float(level), float(boost))
+            for intent, (emotion, level, boost) in self.intent_router.emotion_effects().items()
+            if emotion in self.index
+        }
+        self._mood = array("d", [self._baseline] * len(self.names))
+        self._drive = array("d", [0.0] * len(self.names))
+        self._last_step = clock()
 
     def reset(self) -> None:
-        self.stat_levels["Hunger"] = 0
-        self.stat_levels["Fatigue"] = 0
-
-    def compute(self, context_text: str, sentiment_score: int) -> dict:
-        values = {name: 10 for name in EMOTIONS}
-
-        happiness = 10 + int(sentiment_score * 15)
-        sadness = 70 - int(sentiment_score * 12)
-        values["Happiness"] = self._clamp(happiness)
-        values["Sadness"] = self._clamp(sadness)
-
-        lowered = context_text.lower()
-        self.stat_levels["Hunger"] = self._clamp(self.stat_levels["Hunger"] + 5)
-        self.stat_levels["Fatigue"] = self._clamp(self.stat_levels["Fatigue"] + 3)
-
-        if any(word in lowered for word in ["moe", "slaperig"]):
-            values["Fatigue"] = 75
-            self.stat_levels["Fatigue"] = self._clamp(self.stat_levels["Fatigue"] + 10)
-        if any(word in lowered for word in ["honger", "eten"]):
-            values["Hunger"] = 70
-            self.stat_levels["Hunger"] = self._clamp(self.stat_levels["Hunger"] + 10)
-        if any(word in lowered for word in ["bang", "stress", "zenuw"]):
-            values["Anxiety"] = 72
-        if any(word in lowered for word in ["lief", "dank", "vriend"]):
-            values["Affection"] = 68
-        if any(word in lowered for word in ["nieuw", "wat", "hoe", "?"]):
-            values["Curiosity"] = 60
-        if any(word in lowered for word in ["boos", "frustr", "irrit"]):
-            values["Frustration"] = 70
-
-        values["Hunger"] = max(values["Hunger"], self.stat_levels["Hunger"])
-        values["Fatigue"] = max(values["Fatigue"], self.stat_levels["Fatigue"])
-
-        return {name: self._clamp(value) for name, value in values.items()}
+        with self._lock:
+            for idx in range(len(self.names)):
+                self._mood[idx] = self._baseline
+                self._drive[idx] = 0.0
+            self._last_step = self._clock()
+
+    def compute(self, context_text: str, sentiment_score: int, intents=None) -> dict:
+        if intents is None:
+            intents = self.intent_router.match(context_text)
+        with self._lock:
+            self._advance(self._elapsed())
+            self._set_mood("Happiness", 10 + int(sentiment_score * 15))
+            self._set_mood("Sadness", 70 - int(sentiment_score * 12))
+            for intent in intents.intents:
+                effect = self._effects.get(intent)
+                if effect is None:
+                    continue
+                idx, level, boost = effect
+                self._mood[idx] = max(self._mood[idx], level)
+                if boost:
+                    self._drive[idx] = min(100.0, self._drive[idx] + boost)
+            return self._values()
+
+    def step(self, dt: float | None = None) -> dict:
+        """Moves time forward without any input, e.g. for idle behaviour.
+
+        Without dt the state catches up with the clock; an explicit dt simulates that much time.
+        """
+        with self._lock:
+            self._advance(self._elapsed() if dt is None else dt)
+            return self._values()
+
+    def values(self) -> dict:
+        with self._lock:
+            return self._values()
+
+    def excite(self, name: str, level: float) -> None:
+        """Raises the mood of one emotion to at least level; it decays back from there."""
+        idx = self.index.get(name)
+        if idx is None:
+            return
+        with self._lock:
+            self._mood[idx] = max(self._mood[idx], min(100.0, float(level)))
+
+    def nudge(self, name: str, delta: float) -> tuple[int, int]:
+        """Shifts both mood and drive of one emotion; returns the shown value before and after."""
+        idx = self.index.get(name)
+        if idx is None:
+            return 0, 0
+        with self._lock:
+            before = self._shown(idx)
+            self._mood[idx] = max(0.0, min(100.0, self._mood[idx] + delta))
+            self._drive[idx] = max(0.0, min(100.0, self._drive[idx] + delta))
+            return before, self._shown(idx)
+
+    def _elapsed(self) -> float:
+        now = self._clock()
+        dt = now - self._last_step
+        self._last_step = now
+        return dt
+
+    def _advance(self, dt: float) -> None:
+        if dt <= 0:
+            return
+        baseline = self._baseline
+        for idx in range(len(self.names)):
+            rate = self._decay_rate[idx]
+            if rate:
+                self._mood[idx] = baseline + (self._mood[idx] - baseline) * math.exp(-rate * dt)
+            if self._drive_rate[idx]:
+                self._drive[idx] = min(100.0, self._drive[idx] + self._drive_rate[idx] * dt)
+
+    def _set_mood(self, name: str, value: int) -> None:
+        idx = self.index.get(name)
+        if idx is not None:
+            self._mood[idx] = float(self._clamp(value))
+
+    def _shown(self, idx: int) -> int:
+        return self._clamp(max(self._mood[idx], self._drive[idx]))
+
+    def _values(self) -> dict:
+        return {name: self._shown(idx) for idx, name in enumerate(self.names)}
 
     def _clamp(self, value: int) -> int:
         return max(0, min(100, int(value)))
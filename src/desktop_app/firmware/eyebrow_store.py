@@ -1,4 +1,4 @@
-from settings_loader import load_settings
+from settings_loader import settings_store
 
 
 def _default_for_emotions(emotions: list[str]) -> dict[str, tuple[int, int]]:
@@ -6,15 +6,8 @@ def _default_for_emotions(emotions: list[str]) -> dict[str, tuple[int, int]]:
 
 
 def load_eyebrow_angles(emotions: list[str]) -> dict[str, tuple[int, int]]:
-    settings = load_settings()
-    raw = (
-        settings.get("robot", {})
-        .get("defaults", {})
-        .get("eyebrow_angles_by_emotion", {})
-    )
+    raw = settings_store().get_dict("robot.defaults.eyebrow_angles_by_emotion")
     result = _default_for_emotions(emotions)
-    if not isinstance(raw, dict):
-        return result
 
     for emotion in emotions:
         key = emotion.upper()
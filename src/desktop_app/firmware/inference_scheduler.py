@@ -0,0 +1,193 @@
+import heapq
+import itertools
+import threading
+import time
+
+from config import LLM_QUEUE_SIZE
+
+
+# Lower runs first.
+PRIORITY_CHAT = 0
+PRIORITY_BACKGROUND = 10
+
+REQUEST_PENDING = "PENDING"
+REQUEST_RUNNING = "RUNNING"
+REQUEST_DONE = "DONE"
+REQUEST_FAILED = "FAILED"
+REQUEST_CANCELLED = "CANCELLED"
+REQUEST_EXPIRED = "EXPIRED"
+_FINISHED_STATES = (REQUEST_DONE, REQUEST_FAILED, REQUEST_CANCELLED, REQUEST_EXPIRED)
+
+
+class InferenceRequest:
+    """One unit of model work; fn(request) should poll should_stop() at safe points."""
+
+    def __init__(self, fn, session: str, priority: int, deadline: float | None, on_done=None) -> None:
+        self.fn = fn
+        self.session = session
+        self.priority = priority
+        self.deadline = deadline
+        self.on_done = on_done
+        self.state = REQUEST_PENDING
+        self.result = None
+        self.error = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def should_stop(self) -> bool:
+        return self.cancelled or self.expired
+
+    def wait(self, timeout: float | None = None):
+        self._done.wait(timeout)
+        return self.result
+
+    def _finish(self, state: str, result=None, error: Exception | None = None) -> None:
+        self.state = state
+        self.result = result
+        self.error = error
+        self._done.set()
+
+
+class InferenceScheduler:
+    """Bounded priority queue in front of a single inference worker.
+
+    A new request cancels the pending and running requests of the same session, so only the
+    latest message per session is worked on. Requests whose deadline passes while queued are dropped.
+    """
+
+    def __init__(self, queue_size: int = LLM_QUEUE_SIZE, debug_cb=None) -> None:
+        self.queue_size = max(1, int(queue_size))
+        self.debug_cb = debug_cb
+        self.cancelled = 0
+        self.expired = 0
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = None
+        self._thread = None
+
+    def submit(
+        self,
+        fn,
+        session: str = "default",
+        priority: int = PRIORITY_CHAT,
+        timeout_s: float | None = None,
+        on_done=None,
+    ) -> InferenceRequest:
+        deadline = time.monotonic() + timeout_s if timeout_s else None
+        request = InferenceRequest(fn, session, priority, deadline, on_done)
+        dropped = []
+        with self._cond:
+            for _prio, _seq, pending in self._heap:
+                if pending.session == session and not pending.cancelled:
+                    pending.cancel()
+                    dropped.append(pending)
+            if self._running is not None and self._running.session == session:
+                # Cooperative: the running request stops at its next should_stop() check.
+                self._running.cancel()
+            self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+            heapq.heapify(self._heap)
+            if len(self._heap) >= self.queue_size:
+                # Full: the least urgent, newest entry makes room (possibly the new request itself).
+                worst = max(self._heap + [(priority, float("inf"), request)], key=lambda entry: entry[:2])
+                if worst[2] is request:
+                    request.cancel()
+                    dropped.append(request)
+                else:
+                    self._heap.remove(worst)
+                    heapq.heapify(self._heap)
+                    worst[2].cancel()
+                    dropped.append(worst[2])
+            if not request.cancelled:
+                heapq.heappush(self._heap, (priority, next(self._seq), request))
+                self._ensure_worker_locked()
+                self._cond.notify()
+        for pending in dropped:
+            self._complete(pending, REQUEST_CANCELLED)
+        return request
+
+    def cancel_session(self, session: str) -> None:
+        with self._cond:
+            dropped = [entry[2] for entry in self._heap if entry[2].session == session]
+            self._heap = [entry for entry in self._heap if entry[2].session != session]
+            heapq.heapify(self._heap)
+            if self._running is not None and self._running.session == session:
+                self._running.cancel()
+        for pending in dropped:
+            pending.cancel()
+            self._complete(pending, REQUEST_CANCELLED)
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def _ensure_worker_locked(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._worker_loop, name="llm-inference", daemon=True)
+        self._thread.start()
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                _prio, _seq, request = heapq.heappop(self._heap)
+                if request.cancelled:
+                    continue
+                if request.expired:
+                    expired = True
+                else:
+                    expired = False
+                    request.state = REQUEST_RUNNING
+                    self._running = request
+            if expired:
+                self._complete(request, REQUEST_EXPIRED)
+                continue
+            try:
+                result = request.fn(request)
+            except Exception as exc:
+                self._debug(f"TRACE:Inference request faalde: {exc}")
+                state, result, error = REQUEST_FAILED, None, exc
+            else:
+                error = None
+                if request.cancelled:
+                    state = REQUEST_CANCELLED
+                elif request.expired:
+                    # The deadline passed while fn was running; its result is too late to use.
+                    state = REQUEST_EXPIRED
+                else:
+                    state = REQUEST_DONE
+            with self._cond:
+                self._running = None
+            self._complete(request, state, result, error)
+
+    def _complete(self, request: InferenceRequest, state: str, result=None, error=None) -> None:
+        if request.state in _FINISHED_STATES:
+            return
+        if state == REQUEST_CANCELLED:
+            self.cancelled += 1
+        elif state == REQUEST_EXPIRED:
+            self.expired += 1
+            self._debug(f"TRACE:Inference request verlopen ({request.session})")
+        request._finish(state, result, error)
+        if request.on_done is not None:
+            try:
+                request.on_done(request)
+            except Exception as exc:
+                self._debug(f"TRACE:Inference callback faalde: {exc}")
+
+    def _debug(self, message: str) -> None:
+        if self.debug_cb:
+            self.debug_cb(message)
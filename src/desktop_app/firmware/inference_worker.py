@@ -0,0 +1,107 @@
+import queue
+import threading
+import traceback
+
+
+class _WorkerRequest:
+    def __init__(self) -> None:
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def should_stop(self) -> bool:
+        return self._cancel.is_set()
+
+
+def worker_main(conn, backend_name: str) -> None:
+    """Entry point of the inference child process; torch and transformers are only imported here.
+
+    Messages in are (request_id, op, payload); messages out are (request_id, kind, payload) with kind
+    chunk/done/error, or (0, "state"/"debug", payload) for load progress and logging. Model ops run
+    one at a time on a single worker thread; only ping and cancel are answered by the reader loop.
+    """
+    from llm import LOAD_WARMING, LlmEngine
+
+    send_lock = threading.Lock()
+
+    def send(request_id: int, kind: str, payload=None) -> None:
+        with send_lock:
+            try:
+                conn.send((request_id, kind, payload))
+            except (OSError, EOFError):
+                pass
+
+    engine = LlmEngine(
+        debug_cb=lambda message: send(0, "debug", message),
+        state_cb=lambda state, detail: send(0, "state", (state, detail)),
+        backend_name=backend_name,
+        # Replies are cached by the GUI process.
+        response_cache=False,
+    )
+    requests = {}
+
+    def _load() -> tuple[str, str]:
+        engine._ensure_models(final_state=LOAD_WARMING)
+        if not engine.models_ready:
+            raise RuntimeError(engine.model_error or "Geen bruikbaar LLM-model gevonden.")
+        return engine.loaded_model_name, engine.load_profile
+
+    def _generate(request_id: int, prompt: str, params: dict) -> None:
+        request = requests[request_id]
+        if request.cancelled:
+            # Cancelled while still queued.
+            return
+        for chunk in engine.stream_prompt(prompt, request=request, params=params):
+            send(request_id, "chunk", chunk)
+            if request.cancelled:
+                break
+
+    def _run() -> None:
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            request_id, fn, args = job
+            try:
+                send(request_id, "done", fn(*args))
+            except Exception as exc:
+                engine._debug(f"TRACE:{traceback.format_exc()}")
+                send(request_id, "error", str(exc))
+            finally:
+                requests.pop(request_id, None)
+
+    handlers = {
+        "load": _load,
+        "warm_up": engine._warm_up,
+        "sentiment": engine.sentiment_service.score_batch,
+    }
+    jobs = queue.Queue()
+    threading.Thread(target=_run, name="worker-model", daemon=True).start()
+    while True:
+        try:
+            request_id, op, payload = conn.recv()
+        except (EOFError, OSError):
+            # The GUI process is gone.
+            break
+        if op == "shutdown":
+            break
+        if op == "ping":
+            send(request_id, "done", "pong")
+        elif op == "cancel":
+            request = requests.get(payload)
+            if request is not None:
+                request.cancel()
+        elif op == "generate":
+            # Registered now so a cancel also reaches a request that is still queued.
+            requests[request_id] = _WorkerRequest()
+            jobs.put((request_id, _generate, (request_id, payload[0], payload[1])))
+        elif op in handlers:
+            jobs.put((request_id, handlers[op], () if payload is None else (payload,)))
+        else:
+            send(request_id, "error", f"onbekende opdracht: {op}")
+    jobs.put(None)
@@ -0,0 +1,156 @@
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from config import INTENTS
+
+
+_MATCH_CACHE_SIZE = 64
+
+# Replies that depend on the moment they are given; referenced by name from the intent table.
+_ACTIONS = {
+    "time": lambda: f"Het is {datetime.now().strftime('%H:%M:%S')}.",
+}
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton: one pass over the text finds every (overlapping) keyword."""
+
+    def __init__(self, keywords: dict[str, set[str]]) -> None:
+        # keywords: keyword -> labels it reports.
+        self._goto = [{}]
+        self._fail = [0]
+        outputs = [set()]
+        for keyword, labels in keywords.items():
+            state = 0
+            for ch in keyword:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outputs.append(set())
+                state = nxt
+            outputs[state].update(labels)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                outputs[nxt].update(outputs[self._fail[nxt]])
+        self._out = [frozenset(labels) for labels in outputs]
+
+    def find(self, text: str) -> set[str]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+
+class IntentMatch:
+    """Intents found in one (lowered) text; shared by the router, the fallback replies and the emotions."""
+
+    __slots__ = ("text", "intents")
+
+    def __init__(self, text: str, intents: frozenset) -> None:
+        self.text = text
+        self.intents = intents
+
+    def has(self, name: str) -> bool:
+        return name in self.intents
+
+    def union(self, *others: "IntentMatch") -> "IntentMatch":
+        intents = set(self.intents)
+        for other in others:
+            intents |= other.intents
+        return IntentMatch(" ".join([self.text] + [other.text for other in others]), frozenset(intents))
+
+
+class IntentRouter:
+    """Compiles the settings intent table into one keyword automaton.
+
+    Entries: name, keywords (substrings) and/or prefixes, plus optionally reply (answer without
+    the LLM, only for messages up to max_words), action (named dynamic reply), fallback (reply
+    when the LLM is unavailable) and emotion/level/stat_boost (used by EmotionEngine).
+    Table order is priority order.
+    """
+
+    def __init__(self, table: list | None = None) -> None:
+        table = INTENTS if table is None else table
+        self.table = [entry for entry in table if isinstance(entry, dict) and entry.get("name")]
+        keywords = {}
+        prefixes = []
+        for entry in self.table:
+            name = str(entry["name"])
+            for keyword in entry.get("keywords", []):
+                keyword = str(keyword).lower()
+                if keyword:
+                    keywords.setdefault(keyword, set()).add(name)
+            for prefix in entry.get("prefixes", []):
+                if str(prefix):
+                    prefixes.append((str(prefix).lower(), name))
+        self._automaton = KeywordAutomaton(keywords)
+        self._prefixes = tuple(prefixes)
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def match(self, text: str) -> IntentMatch:
+        lowered = (text or "").lower()
+        with self._cache_lock:
+            cached = self._cache.get(lowered)
+            if cached is not None:
+                self._cache.move_to_end(lowered)
+                return cached
+        intents = self._automaton.find(lowered)
+        stripped = lowered.lstrip()
+        intents.update(name for prefix, name in self._prefixes if stripped.startswith(prefix))
+        result = IntentMatch(lowered, frozenset(intents))
+        with self._cache_lock:
+            self._cache[lowered] = result
+            if len(self._cache) > _MATCH_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return result
+
+    def match_all(self, texts: list[str]) -> IntentMatch:
+        matches = [self.match(text) for text in texts]
+        if not matches:
+            return self.match("")
+        return matches[0].union(*matches[1:])
+
+    def reply_for(self, match: IntentMatch) -> str | None:
+        """Direct answer that skips the LLM, from the first matching entry with reply or action."""
+        for entry in self.table:
+            if entry["name"] not in match.intents:
+                continue
+            action = _ACTIONS.get(entry.get("action", ""))
+            if action is not None:
+                return action()
+            max_words = int(entry.get("max_words", 0))
+            if entry.get("reply") and (not max_words or len(match.text.split()) <= max_words):
+                return str(entry["reply"])
+        return None
+
+    def fallback_for(self, match: IntentMatch) -> str | None:
+        for entry in self.table:
+            if entry["name"] in match.intents and entry.get("fallback"):
+                return str(entry["fallback"])
+        return None
+
+    def emotion_effects(self) -> dict[str, tuple[str, int, int]]:
+        """Intent name -> (emotion, level, stat_boost) for every entry that carries an emotion."""
+        return {
+            str(entry["name"]): (str(entry["emotion"]), int(entry.get("level", 0)), int(entry.get("stat_boost", 0)))
+            for entry in self.table
+            if entry.get("emotion")
+        }
@@ -0,0 +1,220 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+FRAME_SEGMENTS = 3
+FRAME_ROWS = 8
+FRAME_COLS = FRAME_SEGMENTS * 8
+FRAME_BYTES = FRAME_SEGMENTS * FRAME_ROWS
+FRAME_BITS = FRAME_BYTES * 8
+
+_FULL = (1 << FRAME_BITS) - 1
+_LANE = (1 << 64) - 1
+
+
+def _repeat(mask64: int) -> int:
+    return mask64 | (mask64 << 64) | (mask64 << 128)
+
+
+# Per-segment masks replicated over the three 64-bit lanes (seg0 is the most significant lane).
+_TRANSPOSE_7 = _repeat(0x00AA00AA00AA00AA)
+_TRANSPOSE_14 = _repeat(0x0000CCCC0000CCCC)
+_TRANSPOSE_28 = _repeat(0x00000000F0F0F0F0)
+_BYTE_55 = _repeat(0x5555555555555555)
+_BYTE_33 = _repeat(0x3333333333333333)
+_BYTE_0F = _repeat(0x0F0F0F0F0F0F0F0F)
+
+
+def transpose_8x8(word: int) -> int:
+    # Row-major, MSB-first bit transpose (three delta swaps); works lane-wise on a whole frame.
+    t = (word ^ (word >> 7)) & _TRANSPOSE_7
+    word ^= t ^ (t << 7)
+    t = (word ^ (word >> 14)) & _TRANSPOSE_14
+    word ^= t ^ (t << 14)
+    t = (word ^ (word >> 28)) & _TRANSPOSE_28
+    word ^= t ^ (t << 28)
+    return word
+
+
+def _reverse_bits_per_byte(word: int) -> int:
+    word = ((word >> 1) & _BYTE_55) | ((word & _BYTE_55) << 1)
+    word = ((word >> 2) & _BYTE_33) | ((word & _BYTE_33) << 2)
+    return ((word >> 4) & _BYTE_0F) | ((word & _BYTE_0F) << 4)
+
+
+def _reverse_rows_per_segment(word: int) -> int:
+    data = word.to_bytes(FRAME_BYTES, "big")
+    return int.from_bytes(b"".join(data[i : i + 8][::-1] for i in range(0, FRAME_BYTES, 8)), "big")
+
+
+def _clamp_byte(value) -> int:
+    try:
+        return max(0, min(255, int(value)))
+    except (TypeError, ValueError):
+        return 0
+
+
+class MatrixFrame:
+    """Immutable 3x8x8 LED matrix image packed into one 192-bit integer.
+
+    Byte order matches settings and the wire: segment 0 rows 0..7, then segment 1, then segment 2.
+    Within a row byte the MSB is the leftmost pixel.
+    """
+
+    __slots__ = ("bits",)
+
+    def __init__(self, bits: int = 0) -> None:
+        self.bits = bits & _FULL
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "MatrixFrame":
+        return cls(int.from_bytes(bytes(data[:FRAME_BYTES]).ljust(FRAME_BYTES, b"\0"), "big"))
+
+    @classmethod
+    def from_segments(cls, segments) -> "MatrixFrame":
+        data = bytearray(FRAME_BYTES)
+        if isinstance(segments, list):
+            for seg in range(min(len(segments), FRAME_SEGMENTS)):
+                rows = segments[seg]
+                if not isinstance(rows, list):
+                    continue
+                for y in range(min(len(rows), FRAME_ROWS)):
+                    data[seg * FRAME_ROWS + y] = _clamp_byte(rows[y])
+        return cls.from_bytes(data)
+
+    @classmethod
+    def from_grid(cls, grid: list[list[int]]) -> "MatrixFrame":
+        rows24 = []
+        for y in range(FRAME_ROWS):
+            row = grid[y] if y < len(grid) else []
+            value = 0
+            for x in range(FRAME_COLS):
+                value = (value << 1) | (1 if x < len(row) and row[x] else 0)
+            rows24.append(value)
+        return cls.from_rows24(rows24)
+
+    @classmethod
+    def from_rows24(cls, rows24: list[int]) -> "MatrixFrame":
+        data = bytearray(FRAME_BYTES)
+        for y, value in enumerate(rows24[:FRAME_ROWS]):
+            for seg in range(FRAME_SEGMENTS):
+                data[seg * FRAME_ROWS + y] = (value >> (8 * (FRAME_SEGMENTS - 1 - seg))) & 0xFF
+        return cls.from_bytes(data)
+
+    def to_bytes(self) -> bytes:
+        return self.bits.to_bytes(FRAME_BYTES, "big")
+
+    def segments(self) -> list[list[int]]:
+        data = self.to_bytes()
+        return [list(data[seg * FRAME_ROWS : (seg + 1) * FRAME_ROWS]) for seg in range(FRAME_SEGMENTS)]
+
+    def segment_rows(self, seg: int) -> list[int]:
+        return list(self._lane(seg).to_bytes(8, "big"))
+
+    def rows24(self) -> list[int]:
+        data = self.to_bytes()
+        return [(data[y] << 16) | (data[FRAME_ROWS + y] << 8) | data[2 * FRAME_ROWS + y] for y in range(FRAME_ROWS)]
+
+    def to_grid(self) -> list[list[int]]:
+        return [[(value >> (FRAME_COLS - 1 - x)) & 1 for x in range(FRAME_COLS)] for value in self.rows24()]
+
+    def _lane(self, seg: int) -> int:
+        return (self.bits >> (64 * (FRAME_SEGMENTS - 1 - seg))) & _LANE
+
+    @staticmethod
+    def _bit(x: int, y: int) -> int:
+        seg, col = divmod(x, 8)
+        return FRAME_BITS - 1 - ((seg * FRAME_ROWS + y) * 8 + col)
+
+    def get(self, x: int, y: int) -> bool:
+        return bool((self.bits >> self._bit(x, y)) & 1)
+
+    def with_pixel(self, x: int, y: int, on: bool) -> "MatrixFrame":
+        mask = 1 << self._bit(x, y)
+        return MatrixFrame(self.bits | mask if on else self.bits & ~mask)
+
+    def toggled(self, x: int, y: int) -> "MatrixFrame":
+        return MatrixFrame(self.bits ^ (1 << self._bit(x, y)))
+
+    def inverted(self) -> "MatrixFrame":
+        return MatrixFrame(self.bits ^ _FULL)
+
+    def flipped_horizontal(self) -> "MatrixFrame":
+        # Mirror the whole 24-wide display: reverse each row byte and swap the outer segments.
+        word = _reverse_bits_per_byte(self.bits)
+        return MatrixFrame((word & (_LANE << 64)) | ((word >> 128) & _LANE) | ((word & _LANE) << 128))
+
+    def flipped_vertical(self) -> "MatrixFrame":
+        return MatrixFrame(_reverse_rows_per_segment(self.bits))
+
+    def rotated_left(self) -> "MatrixFrame":
+        # Each 8x8 segment rotates in place: transpose, then reverse the row order.
+        return MatrixFrame(_reverse_rows_per_segment(transpose_8x8(self.bits)))
+
+    def rotated_right(self) -> "MatrixFrame":
+        return MatrixFrame(_reverse_bits_per_byte(transpose_8x8(self.bits)))
+
+    def shifted(self, dx: int = 0, dy: int = 0) -> "MatrixFrame":
+        # Positive dx moves pixels right, positive dy moves them down; pixels shifted out are dropped.
+        mask24 = (1 << FRAME_COLS) - 1
+        rows = [((value >> dx) if dx >= 0 else (value << -dx)) & mask24 for value in self.rows24()]
+        if dy > 0:
+            rows = [0] * min(dy, FRAME_ROWS) + rows[: max(0, FRAME_ROWS - dy)]
+        elif dy < 0:
+            rows = rows[min(-dy, FRAME_ROWS) :] + [0] * min(-dy, FRAME_ROWS)
+        return MatrixFrame.from_rows24(rows)
+
+    def with_segments_from(self, other: "MatrixFrame", segments: list[int]) -> "MatrixFrame":
+        mask = 0
+        for seg in segments:
+            mask |= _LANE << (64 * (FRAME_SEGMENTS - 1 - seg))
+        return MatrixFrame((self.bits & ~mask) | (other.bits & mask))
+
+    def changed_segments(self, other: "MatrixFrame") -> list[int]:
+        diff = self.bits ^ other.bits
+        return [seg for seg in range(FRAME_SEGMENTS) if (diff >> (64 * (FRAME_SEGMENTS - 1 - seg))) & _LANE]
+
+    def changed_pixels(self, other: "MatrixFrame") -> list[tuple[int, int]]:
+        diff = self.bits ^ other.bits
+        pixels = []
+        while diff:
+            low = diff & -diff
+            index = FRAME_BITS - low.bit_length()
+            byte_index, col = divmod(index, 8)
+            seg, y = divmod(byte_index, FRAME_ROWS)
+            pixels.append((seg * 8 + col, y))
+            diff ^= low
+        return pixels
+
+    def lit_count(self) -> int:
+        return bin(self.bits).count("1")
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, MatrixFrame) and self.bits == other.bits
+
+    def __hash__(self) -> int:
+        return hash(self.bits)
+
+    def __repr__(self) -> str:
+        return f"MatrixFrame(0x{self.bits:048x})"
+
+
+def frames_to_grids(frames: list[MatrixFrame]):
+    """Batch unpack to an (n, 8, 24) uint8 array; falls back to nested lists without NumPy."""
+    if np is None:
+        return [frame.to_grid() for frame in frames]
+    data = np.frombuffer(b"".join(frame.to_bytes() for frame in frames), dtype=np.uint8)
+    bits = np.unpackbits(data.reshape(len(frames), FRAME_SEGMENTS, FRAME_ROWS, 1), axis=-1)
+    return bits.transpose(0, 2, 1, 3).reshape(len(frames), FRAME_ROWS, FRAME_COLS)
+
+
+def grids_to_frames(grids) -> list[MatrixFrame]:
+    if np is None:
+        return [MatrixFrame.from_grid(grid) for grid in grids]
+    array = (np.asarray(grids, dtype=np.uint8) != 0).astype(np.uint8)
+    count = array.shape[0]
+    array = array.reshape(count, FRAME_ROWS, FRAME_SEGMENTS, 8).transpose(0, 2, 1, 3)
+    packed = np.packbits(array, axis=-1).reshape(count, FRAME_BYTES)
+    return [MatrixFrame.from_bytes(row.tobytes()) for row in packed]
@@ -1,12 +1,20 @@
-import copy
-
-from settings_loader import load_settings, save_settings
+from led_matrix_frame import MatrixFrame
+from settings_loader import settings_store
 
 
 MATRIX_SEGMENTS = 3
 MATRIX_ROWS = 8
 MATRIX_COLS = MATRIX_SEGMENTS * 8
 
+# Logical order in settings/UI is left, center, right.
+# Hardware send order is flipped for outer matrices: right, center, left.
+_SEGMENT_TX_INDEX = (2, 1, 0)
+
+# emotion -> frame bits of its pattern; cleared by invalidate_matrix_command_cache() when patterns change
+_emotion_frame_bits: dict[str, int] = {}
+# (frame bits, compensate_rotation) -> ready-to-send MATRIX commands, shared by emotions and animation frames
+_frame_command_cache: dict[tuple[int, bool], tuple[str, ...]] = {}
+
 _LEGACY_8X8 = {
     "Happiness": [0, 66, 165, 129, 165, 153, 66, 60],
     "Fatigue": [0, 195, 165, 129, 165, 129, 66, 60],
@@ -35,25 +43,8 @@ def default_patterns_for_emotions(emotions: list[str]) -> dict[str, list[list[in
     return {emotion: _seed_for_emotion(emotion) for emotion in emotions}
 
 
-def _normalize_segment_rows(rows) -> list[int]:
-    out = [0 for _ in range(MATRIX_ROWS)]
-    if not isinstance(rows, list):
-        return out
-    for i in range(min(len(rows), MATRIX_ROWS)):
-        try:
-            out[i] = max(0, min(255, int(rows[i])))
-        except (TypeError, ValueError):
-            out[i] = 0
-    return out
-
-
 def _normalize_emotion_segments(value) -> list[list[int]]:
-    normalized = _blank_segments()
-    if not isinstance(value, list):
-        return normalized
-    for seg in range(min(len(value), MATRIX_SEGMENTS)):
-        normalized[seg] = _normalize_segment_rows(value[seg])
-    return normalized
+    return MatrixFrame.from_segments(value).segments()
 
 
 def normalize_patterns(raw_patterns, emotions: list[str]) -> dict[str, list[list[int]]]:
@@ -69,20 +60,42 @@ def normalize_patterns(raw_patterns, emotions: list[str]) -> dict[str, list[list
 
 
 def load_led_matrix_patterns(emotions: list[str]) -> dict[str, list[list[int]]]:
-    settings = load_settings()
-    desktop = settings.get("desktop_app", {})
-    led_matrix = desktop.get("led_matrix", {})
-    raw = led_matrix.get("patterns_by_emotion", {})
-    return normalize_patterns(raw, emotions)
+    raw = settings_store().get_dict("desktop_app.led_matrix.patterns_by_emotion")
+    patterns = normalize_patterns(raw, emotions)
+    compile_matrix_commands(patterns)
+    return patterns
+
+
+def load_led_matrix_animations(
+    emotions: list[str], patterns_by_emotion: dict[str, list[list[int]]]
+) -> dict[str, tuple[list[tuple[MatrixFrame, float]], bool]]:
+    """Frame sequences per emotion as ([(frame, seconds), ...], loop); a static pattern is one frame."""
+    raw_all = settings_store().get_dict("desktop_app.led_matrix.animations_by_emotion")
+    out = {}
+    for emotion in emotions:
+        static = ([(MatrixFrame.from_segments(patterns_by_emotion.get(emotion)), 0.0)], False)
+        raw = raw_all.get(emotion)
+        if not isinstance(raw, dict) or not isinstance(raw.get("frames"), list):
+            out[emotion] = static
+            continue
+        frames = []
+        for item in raw["frames"]:
+            if not isinstance(item, dict):
+                continue
+            try:
+                duration = max(20, int(item.get("duration_ms", 200))) / 1000.0
+            except (TypeError, ValueError):
+                duration = 0.2
+            frames.append((MatrixFrame.from_segments(item.get("segments")), duration))
+        out[emotion] = (frames, bool(raw.get("loop", True))) if frames else static
+    return out
 
 
 def save_led_matrix_patterns(patterns_by_emotion: dict[str, list[list[int]]], emotions: list[str]) -> None:
     normalized = normalize_patterns(patterns_by_emotion, emotions)
-    settings = load_settings()
-    desktop = settings.setdefault("desktop_app", {})
-    led_matrix = desktop.setdefault("led_matrix", {})
-    led_matrix["patterns_by_emotion"] = normalized
-    save_settings(settings)
+    # Debounced: a burst of save clicks ends up as one write; only the patterns subtree is re-serialized.
+    settings_store().update("desktop_app.led_matrix.patterns_by_emotion", normalized)
+    invalidate_matrix_command_cache()
 
 
 def blank_pattern() -> list[list[int]]:
@@ -94,58 +107,51 @@ def blank_patterns_for_emotions(emotions: list[str]) -> dict[str, list[list[int]
 
 
 def segments_to_grid(segments: list[list[int]]) -> list[list[int]]:
-    grid = [[0 for _ in range(MATRIX_COLS)] for _ in range(MATRIX_ROWS)]
-    norm = _normalize_emotion_segments(segments)
-    for seg in range(MATRIX_SEGMENTS):
-        for y in range(MATRIX_ROWS):
-            row_byte = norm[seg][y]
-            for x in range(8):
-                bit = (row_byte >> (7 - x)) & 0x01
-                grid[y][seg * 8 + x] = bit
-    return grid
+    return MatrixFrame.from_segments(segments).to_grid()
 
 
 def grid_to_segments(grid: list[list[int]]) -> list[list[int]]:
-    segments = _blank_segments()
-    for seg in range(MATRIX_SEGMENTS):
-        for y in range(MATRIX_ROWS):
-            row_val = 0
-            if y < len(grid):
-                row = grid[y]
-                for x in range(8):
-                    gx = seg * 8 + x
-                    bit = 1 if gx < len(row) and row[gx] else 0
-                    row_val = (row_val << 1) | bit
-            segments[seg][y] = row_val
-    return segments
+    return MatrixFrame.from_grid(grid).segments()
 
 
-def _rows_to_matrix(rows: list[int]) -> list[list[int]]:
-    matrix = [[0 for _ in range(8)] for _ in range(8)]
-    for y in range(8):
-        row_byte = rows[y]
-        for x in range(8):
-            matrix[y][x] = (row_byte >> (7 - x)) & 0x01
-    return matrix
+def _build_matrix_commands(frame: MatrixFrame, compensate_rotation: bool) -> tuple[str, ...]:
+    payload = frame.rotated_left() if compensate_rotation else frame
+    data = payload.to_bytes()
+    commands = []
+    for seg_idx in range(MATRIX_SEGMENTS):
+        csv = ",".join(str(v) for v in data[seg_idx * 8 : seg_idx * 8 + 8])
+        commands.append(f"MATRIX:{_SEGMENT_TX_INDEX[seg_idx]},{csv}")
+    return tuple(commands)
 
 
-def _matrix_to_rows(matrix: list[list[int]]) -> list[int]:
-    rows = [0 for _ in range(8)]
-    for y in range(8):
-        row_val = 0
-        for x in range(8):
-            row_val = (row_val << 1) | (1 if matrix[y][x] else 0)
-        rows[y] = row_val
-    return rows
+def compile_matrix_commands(
+    patterns_by_emotion: dict[str, list[list[int]]], compensate_rotation: bool = True
+) -> dict[str, tuple[str, ...]]:
+    compiled = {}
+    for emotion, pattern in patterns_by_emotion.items():
+        frame = MatrixFrame.from_segments(pattern)
+        _emotion_frame_bits[emotion] = frame.bits
+        compiled[emotion] = tuple(matrix_commands_for_frame(frame, compensate_rotation=compensate_rotation))
+    return compiled
 
 
-def _rotate_left_8x8(rows: list[int]) -> list[int]:
-    src = _rows_to_matrix(rows)
-    rotated = [[0 for _ in range(8)] for _ in range(8)]
-    for y in range(8):
-        for x in range(8):
-            rotated[y][x] = src[x][7 - y]
-    return _matrix_to_rows(rotated)
+def matrix_commands_for_frame(
+    frame: MatrixFrame, segments: list[int] | None = None, compensate_rotation: bool = True
+) -> list[str]:
+    key = (frame.bits, compensate_rotation)
+    commands = _frame_command_cache.get(key)
+    if commands is None:
+        if len(_frame_command_cache) >= 256:
+            _frame_command_cache.clear()
+        commands = _build_matrix_commands(frame, compensate_rotation)
+        _frame_command_cache[key] = commands
+    if segments is None:
+        return list(commands)
+    return [commands[seg] for seg in segments]
+
+
+def invalidate_matrix_command_cache() -> None:
+    _emotion_frame_bits.clear()
 
 
 def matrix_commands_for_emotion(
@@ -153,13 +159,11 @@ def matrix_commands_for_emotion(
 ) -> list[str]:
     if emotion not in patterns_by_emotion:
         return []
-    segments = _normalize_emotion_segments(copy.deepcopy(patterns_by_emotion[emotion]))
-    commands = []
-    # Logical order in settings/UI is left, center, right.
-    # Hardware send order is flipped for outer matrices: right, center, left.
-    segment_tx_index = [2, 1, 0]
-    for seg_idx, rows in enumerate(segments):
-        payload_rows = _rotate_left_8x8(rows) if compensate_rotation else rows
-        csv = ",".join(str(v) for v in payload_rows)
-        commands.append(f"MATRIX:{segment_tx_index[seg_idx]},{csv}")
-    return commands
+    bits = _emotion_frame_bits.get(emotion)
+    if bits is None:
+        bits = MatrixFrame.from_segments(patterns_by_emotion[emotion]).bits
+        _emotion_frame_bits[emotion] = bits
+    commands = _frame_command_cache.get((bits, compensate_rotation))
+    if commands is None:
+        return matrix_commands_for_frame(MatrixFrame(bits), compensate_rotation=compensate_rotation)
+    return list(commands)
@@ -1,45 +1,306 @@
+import gc
+import importlib.util
 import os
 import random
 import re
 import sys
 import threading
+import time
 import traceback
 import types
 from pathlib import Path
 
 from config import (
+    LLM_ASSISTANT_MODEL_NAME,
+    LLM_ASSISTED_GENERATION,
+    LLM_BACKEND,
     LLM_FALLBACK_MODEL_NAMES,
+    LLM_LOAD_PROFILE,
     LLM_MODEL_NAME,
     SENTIMENT_MODEL_NAME,
     LLM_ALLOW_DOWNLOAD,
     LLM_MAX_NEW_TOKENS,
     LLM_MIN_NEW_TOKENS,
+    LLM_PREFIX_CACHE,
+    LLM_RESPONSE_CACHE,
     LLM_REPETITION_PENALTY,
     LLM_TEMPERATURE,
     LLM_TOP_P,
 )
+from inference_scheduler import PRIORITY_BACKGROUND, InferenceScheduler
+from intent_router import IntentRouter
+from llm_backends import create_backend, hf_generate_kwargs, make_stopping_criteria
+from reply_text import MAX_REPLY_SENTENCES, MAX_REPLY_WORDS, complete_clauses, reply_is_complete, sentence_chunks
+from response_cache import ResponseCache
+from sentiment_service import SENTIMENT_UNAVAILABLE, SentimentService
+
+LOAD_IDLE = "IDLE"
+LOAD_IMPORTING = "IMPORTING"
+LOAD_TOKENIZER = "LOADING_TOKENIZER"
+LOAD_WEIGHTS = "LOADING_WEIGHTS"
+LOAD_WARMING = "WARMING"
+LOAD_READY = "READY"
+LOAD_FAILED = "FAILED"
+_LOAD_BUSY_STATES = (LOAD_IMPORTING, LOAD_TOKENIZER, LOAD_WEIGHTS, LOAD_WARMING)
+
+# Largest to smallest resident size; a resource error steps down to the next profile of the same model.
+LOAD_PROFILES = ("fp32", "bf16", "int8")
+# Keeps the checkpoint dtype memory-mapped; its resident size can exceed int8, so it is never a step down
+# and only used when load_profile asks for it explicitly.
+LOAD_PROFILE_LOW_MEM = "low_mem"
+_PROFILE_BYTES_PER_PARAM = {"fp32": 4.0, "bf16": 2.0, "int8": 1.0}
+# Headroom for activations, KV cache, tokenizer and the rest of the app.
+_MEMORY_MARGIN = 1.3
+# A separate backend (e.g. a local server) may come up after the app; retry connecting this often.
+_BACKEND_RETRY_S = 30.0
 
 
 class LlmEngine:
-    def __init__(self, debug_cb=None) -> None:
+    def __init__(
+        self,
+        debug_cb=None,
+        state_cb=None,
+        backend_name: str = LLM_BACKEND,
+        intent_router=None,
+        response_cache: bool = LLM_RESPONSE_CACHE,
+    ) -> None:
         self.generator = None
         self.sentiment = None
+        self.sentiment_service = SentimentService(debug_cb=debug_cb)
         self.models_ready = False
         self.model_error = ""
         self.last_fallback = ""
         self.loaded_model_name = ""
-        self.model_lock = threading.Lock()
+        self.load_profile = ""
+        # Draft model for assisted generation; the tokenizer is only set when its vocabulary differs.
+        self.assistant_model = None
+        self.assistant_tokenizer = None
+        self.assistant_model_name = ""
+        # All model work (generation, warm-up) runs on this single worker, one request at a time.
+        self.scheduler = InferenceScheduler(debug_cb=debug_cb)
         self.debug_cb = debug_cb
+        self.state_cb = state_cb
+        self.load_state = LOAD_IDLE
+        self._load_lock = threading.Lock()
         self.disable_model_loading = False
+        self.prefix_cache_enabled = LLM_PREFIX_CACHE
+        self.prefix_tokens_reused = 0
+        # (model, prompt token ids, past key/values) of the previous turn.
+        self._prefix_cache = None
+        self.response_cache = ResponseCache(debug_cb=debug_cb) if response_cache else None
+        self.last_response_cached = False
+        self.intent_router = intent_router or IntentRouter()
+        # Replaced as a whole by apply_sampling(), so a running generation keeps its own copy.
+        self.sampling = {
+            "max_new_tokens": LLM_MAX_NEW_TOKENS,
+            "min_new_tokens": LLM_MIN_NEW_TOKENS,
+            "temperature": LLM_TEMPERATURE,
+            "top_p": LLM_TOP_P,
+            "repetition_penalty": LLM_REPETITION_PENALTY,
+        }
+        # None: the built-in in-process transformers pipeline below.
+        self.backend = create_backend(backend_name)
+        if self.backend is not None:
+            self.backend.state_cb = self._set_load_state
+            self.backend.debug_cb = debug_cb
+        self._backend_retry_at = 0.0
 
     def generate_response(
-        self, message: str, history: list | None = None, emotions: dict | None = None
+        self,
+        message: str,
+        history: list | None = None,
+        emotions: dict | None = None,
+        on_partial=None,
+        request=None,
+        intents=None,
     ) -> str:
-        self._ensure_models()
-        if not self.models_ready or self.generator is None:
-            return self._local_fallback_response(message, emotions)
         history = history or []
         emotions = emotions or {}
+        self.last_response_cached = False
+        cache_key = None
+        if self.response_cache is not None:
+            cache_key = self.response_cache.key(message, history, emotions)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                self.last_response_cached = True
+                return cached
+        if self.is_loading():
+            # Don't block the chat on a background preload; answer locally until the model is ready.
+            return self._local_fallback_response(message, emotions, intents)
+        self._ensure_models()
+        if not self.models_ready:
+            return self._local_fallback_response(message, emotions, intents)
+        try:
+            reply = ""
+            last_partial = ""
+            stream = self.stream_response(message, history=history, emotions=emotions, request=request)
+            try:
+                for chunk in stream:
+                    reply += chunk
+                    if request is not None and request.should_stop():
+                        # Closing the stream sets the stop event, so the model stops generating too.
+                        break
+                    if on_partial is None:
+                        continue
+                    partial = self._complete_clauses(reply)
+                    if partial and partial != last_partial and len(partial.split()) <= 20:
+                        last_partial = partial
+                        on_partial(partial)
+            finally:
+                stream.close()
+            if request is not None and request.should_stop():
+                # Cancelled or past its deadline: a cut-off reply is neither shown nor cached.
+                return ""
+            reply = reply.strip()
+            if not reply:
+                return self._error_response()
+            reply = self._truncate_reply(reply)
+            if cache_key is not None and not (request is not None and request.should_stop()):
+                self.response_cache.put(cache_key, reply)
+            return reply
+        except Exception as exc:
+            self._debug(f"LLM_ERROR: {exc}")
+            self._debug(f"TRACE:{traceback.format_exc()}")
+            if request is not None and request.should_stop():
+                return ""
+            if self._recover_with_smaller_model():
+                return self.generate_response(
+                    message,
+                    history=history,
+                    emotions=emotions,
+                    on_partial=on_partial,
+                    request=request,
+                    intents=intents,
+                )
+            return self._local_fallback_response(message, emotions, intents)
+
+    def stream_response(
+        self, message: str, history: list | None = None, emotions: dict | None = None, request=None
+    ):
+        """Yield the first reply line in chunks while the model is still generating.
+
+        Call from the scheduler worker; a cancelled or expired request stops generation early.
+        """
+        prompt = self._build_prompt(message, history or [], emotions or {})
+        chunks = self.stream_prompt(prompt, request=request)
+        text = ""
+        emitted = ""
+        try:
+            for chunk in chunks:
+                text += chunk
+                line = text.lstrip()
+                cut = line.find("\n")
+                if cut >= 0:
+                    line = line[:cut]
+                if len(line) > len(emitted):
+                    yield line[len(emitted) :]
+                    emitted = line
+                if cut >= 0 or reply_is_complete(line):
+                    # Only the first line, up to the truncation limits, is used; stop generating the rest.
+                    break
+        finally:
+            chunks.close()
+
+    def stream_prompt(self, prompt: str, request=None, params: dict | None = None):
+        """Raw text chunks for an already built prompt, from the configured backend."""
+        params = params or self._sampling_params()
+        if self.backend is not None:
+            return self.backend.stream(prompt, params, request)
+        return self._stream_transformers(prompt, params, request)
+
+    def close(self) -> None:
+        if self.backend is not None:
+            self.backend.close()
+
+    def _stream_transformers(self, prompt: str, params: dict, request=None):
+        from transformers import TextIteratorStreamer
+
+        tokenizer = self.generator.tokenizer
+        model = self.generator.model
+        inputs = tokenizer(prompt, return_tensors="pt")
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        stop_event = threading.Event()
+        errors = []
+
+        def _generate() -> None:
+            kwargs = hf_generate_kwargs(params, tokenizer)
+            kwargs["streamer"] = streamer
+            kwargs["stopping_criteria"] = make_stopping_criteria(
+                stop_event, request, tokenizer=tokenizer, prompt_length=inputs["input_ids"].shape[-1]
+            )
+            if self.prefix_cache_enabled:
+                kwargs["return_dict_in_generate"] = True
+            try:
+                prompt_ids = inputs["input_ids"][0].tolist()
+                reuse = self.prefix_cache_enabled and self.assistant_model is None
+                past = self._take_prefix_cache(model, prompt_ids) if reuse else None
+                if self.assistant_model is not None:
+                    # The draft model keeps its own cache, so the primary prefill is not reused here.
+                    assisted = dict(kwargs, **self._assistant_kwargs(tokenizer))
+                    try:
+                        output = model.generate(**inputs, **assisted)
+                    except (TypeError, ValueError, NotImplementedError) as exc:
+                        self._disable_assistant(f"assisted generation uitgeschakeld: {exc}")
+                        output = model.generate(**inputs, **kwargs)
+                elif past is not None:
+                    try:
+                        output = model.generate(**inputs, past_key_values=past, **kwargs)
+                    except Exception as exc:
+                        # Older transformers or unusual cache types: give up on reuse, prefill normally.
+                        self.prefix_cache_enabled = False
+                        self._debug(f"TRACE:KV-cache hergebruik uitgeschakeld: {exc}")
+                        output = model.generate(**inputs, **kwargs)
+                else:
+                    output = model.generate(**inputs, **kwargs)
+                if self.prefix_cache_enabled:
+                    self._store_prefix_cache(model, prompt_ids, getattr(output, "past_key_values", None))
+            except Exception as exc:
+                errors.append(exc)
+                streamer.end()
+
+        worker = threading.Thread(target=_generate, name="llm-generate", daemon=True)
+        worker.start()
+        try:
+            yield from streamer
+        finally:
+            stop_event.set()
+            worker.join()
+        if errors:
+            raise errors[0]
+
+    def count_tokens(self, text: str) -> int | None:
+        if self.backend is not None:
+            return self.backend.count_tokens(text) if self.models_ready else None
+        generator = self.generator
+        if generator is None:
+            return None
+        return len(generator.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def _take_prefix_cache(self, model, prompt_ids: list[int]):
+        cached, self._prefix_cache = self._prefix_cache, None
+        self.prefix_tokens_reused = 0
+        if cached is None or cached[0] is not model:
+            return None
+        _model, cached_ids, past = cached
+        # Keep at least one prompt token uncached; generate needs something to prefill.
+        limit = min(len(cached_ids), len(prompt_ids) - 1)
+        common = 0
+        while common < limit and cached_ids[common] == prompt_ids[common]:
+            common += 1
+        if common < 8 or not hasattr(past, "crop"):
+            return None
+        past.crop(common)
+        self.prefix_tokens_reused = common
+        self._debug(f"TRACE:KV-cache hergebruikt: {common}/{len(prompt_ids)} prompt tokens")
+        return past
+
+    def _store_prefix_cache(self, model, prompt_ids: list[int], past) -> None:
+        if past is None or not hasattr(past, "crop"):
+            return
+        # The cache also holds the generated tokens; the next turn crops it to the shared prefix.
+        self._prefix_cache = (model, prompt_ids, past)
+
+    def _build_prompt(self, message: str, history: list, emotions: dict) -> str:
         emotion_lines = (
             ", ".join([f"{name}={value}%" for name, value in emotions.items()]) or "onbekend"
         )
@@ -47,7 +308,7 @@ class LlmEngine:
         if emotions:
             dominant = max(emotions.items(), key=lambda kv: kv[1])[0]
         history_text = "\n".join(history).strip()
-        prompt = (
+        return (
             "System:\n"
             "Je bent NIER, een vriendelijke sociale robot. Antwoord altijd in het Nederlands.\n"
             "Stijl: informeel, warm, menselijk. Spreek de gebruiker met 'je/jij' aan.\n"
@@ -55,51 +316,126 @@ class LlmEngine:
             "Vermijd formele woorden of plechtige zinnen. Gebruik hoofdletters en leestekens op de juiste plaats.\n"
             "Antwoord direct op de vraag.\n"
             "Formaat: maximaal 1-2 zinnen, maximaal 20 woorden. Geen afgebroken zinnen.\n\n"
-            f"Emoties (percentages): {emotion_lines}\n"
-            f"Dominante emotie: {dominant}\n\n"
+            # System block and history come first so they form a prefix that stays stable between turns.
             "Gespreksgeschiedenis:\n"
             f"{history_text}\n\n"
+            f"Emoties (percentages): {emotion_lines}\n"
+            f"Dominante emotie: {dominant}\n\n"
             f"Gebruiker: {message}\n"
             "NIER:"
         )
+
+    def _sampling_params(self) -> dict:
+        return dict(self.sampling)
+
+    def apply_sampling(self, llm_settings: dict) -> bool:
+        """Swaps in new sampling knobs from the llm settings subtree; the loaded model is kept."""
+        current = self.sampling
         try:
-            with self.model_lock:
-                output = self.generator(
-                    prompt,
-                    max_new_tokens=LLM_MAX_NEW_TOKENS,
-                    min_new_tokens=LLM_MIN_NEW_TOKENS,
-                    do_sample=True,
-                    temperature=LLM_TEMPERATURE,
-                    top_p=LLM_TOP_P,
-                    repetition_penalty=LLM_REPETITION_PENALTY,
-                )
-            generated = output[0]["generated_text"]
-            reply = generated[len(prompt) :].strip()
-            if not reply:
-                return self._error_response()
-            dutch = reply.split("\n")[0].strip()
-            return self._truncate_reply(dutch)
-        except Exception as exc:
-            self._debug(f"LLM_ERROR: {exc}")
-            self._debug(f"TRACE:{traceback.format_exc()}")
-            if self._recover_with_smaller_model():
-                return self.generate_response(message, history=history, emotions=emotions)
-            return self._local_fallback_response(message, emotions)
+            sampling = {
+                "max_new_tokens": int(llm_settings.get("max_new_tokens", current["max_new_tokens"])),
+                "min_new_tokens": int(llm_settings.get("min_new_tokens", current["min_new_tokens"])),
+                "temperature": float(llm_settings.get("temperature", current["temperature"])),
+                "top_p": float(llm_settings.get("top_p", current["top_p"])),
+                "repetition_penalty": float(llm_settings.get("repetition_penalty", current["repetition_penalty"])),
+            }
+        except (TypeError, ValueError) as exc:
+            self._debug(f"Ongeldige sampling-instellingen genegeerd: {exc}")
+            return False
+        if sampling == current:
+            return False
+        self.sampling = sampling
+        self._debug("Sampling-instellingen bijgewerkt")
+        return True
+
+    def _generation_kwargs(self, tokenizer) -> dict:
+        return hf_generate_kwargs(self._sampling_params(), tokenizer)
+
+    @staticmethod
+    def _complete_clauses(text: str) -> str:
+        return complete_clauses(text)
 
     def sentiment_score(self, text: str) -> int:
+        if self.is_loading():
+            return SENTIMENT_UNAVAILABLE
         self._ensure_models()
-        if not self.models_ready or self.sentiment is None:
-            return 2
-        try:
-            with self.model_lock:
-                result = self.sentiment(text[:256])
-            label = result[0].get("label", "3 stars")
-            digits = "".join(ch for ch in label if ch.isdigit())
-            return int(digits) if digits else 3
-        except Exception:
-            return 3
+        return self.sentiment_service.score(text)
+
+    def submit_sentiment(self, text: str, callback) -> None:
+        """Score asynchronously on the sentiment worker; callback(score) runs on that worker thread."""
+        if self.is_loading():
+            callback(SENTIMENT_UNAVAILABLE)
+            return
+        self._ensure_models()
+        self.sentiment_service.submit(text, callback)
+
+    def is_loading(self) -> bool:
+        return self.load_state in _LOAD_BUSY_STATES
+
+    def preload(self) -> None:
+        """Load and warm up the models on a background thread; generate_response falls back meanwhile."""
+        if self.load_state != LOAD_IDLE:
+            return
+        self._set_load_state(LOAD_IMPORTING)
+        threading.Thread(target=self._preload_worker, name="llm-preload", daemon=True).start()
+
+    def _preload_worker(self) -> None:
+        self._ensure_models(final_state=LOAD_WARMING)
+        if not self.models_ready:
+            if self.load_state != LOAD_FAILED:
+                self._set_load_state(LOAD_FAILED, self.model_error)
+            return
+        self._set_load_state(LOAD_WARMING)
+        warm_up = self.scheduler.submit(
+            lambda _request: self._warm_up(), session="warm-up", priority=PRIORITY_BACKGROUND
+        )
+        warm_up.wait()
+        if warm_up.error is not None:
+            # A failed warm-up only costs latency on the first real message.
+            self._debug(f"TRACE:Warm-up faalde: {warm_up.error}")
+        self._set_load_state(LOAD_READY, self.loaded_model_name)
+
+    def _warm_up(self) -> None:
+        # One short generation on the real system prompt: initialises kernels and seeds the prefix KV cache.
+        if self.backend is not None:
+            self.backend.warm_up(self._build_prompt("Hallo", [], {}), self._sampling_params())
+            self.sentiment_service.score_batch(["Hallo"])
+            return
+        tokenizer = self.generator.tokenizer
+        model = self.generator.model
+        inputs = tokenizer(self._build_prompt("Hallo", [], {}), return_tensors="pt")
+        kwargs = self._generation_kwargs(tokenizer)
+        kwargs["max_new_tokens"] = 1
+        kwargs["min_new_tokens"] = 1
+        if self.prefix_cache_enabled:
+            kwargs["return_dict_in_generate"] = True
+        if self.assistant_model is not None:
+            kwargs.update(self._assistant_kwargs(tokenizer))
+        output = model.generate(**inputs, **kwargs)
+        if self.prefix_cache_enabled:
+            self._store_prefix_cache(model, inputs["input_ids"][0].tolist(), getattr(output, "past_key_values", None))
+        self.sentiment_service.score_batch(["Hallo"])
+
+    def _set_load_state(self, state: str, detail: str = "") -> None:
+        if state == self.load_state:
+            return
+        self.load_state = state
+        if self.state_cb:
+            self.state_cb(state, detail)
 
-    def _ensure_models(self) -> None:
+    def _ensure_models(self, final_state: str = LOAD_READY) -> None:
+        with self._load_lock:
+            self._ensure_models_locked()
+        if self.models_ready:
+            if self.load_state in (LOAD_IMPORTING, LOAD_TOKENIZER, LOAD_WEIGHTS):
+                self._set_load_state(final_state, self._model_detail())
+        elif self.load_state != LOAD_FAILED and (self.model_error or self.disable_model_loading):
+            self._set_load_state(LOAD_FAILED, self.model_error)
+
+    def _ensure_models_locked(self) -> None:
+        if self.backend is not None:
+            self._ensure_backend_locked()
+            return
         if self._should_disable_local_llm_by_default():
             self.disable_model_loading = True
             if not self.model_error:
@@ -114,6 +450,7 @@ class LlmEngine:
             os.environ.setdefault("TORCHDYNAMO_DISABLE", "1")
             os.environ.setdefault("TORCH_COMPILE_DISABLE", "1")
             os.environ.setdefault("HF_ENABLE_PARALLEL_LOADING", "0")
+            self._set_load_state(LOAD_IMPORTING)
             self._install_torch_dynamo_stub()
             from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
         except Exception as exc:
@@ -135,6 +472,8 @@ class LlmEngine:
                 self.last_fallback = loaded_model_name
                 self._debug(f"LLM fallback actief: {loaded_model_name}")
             self._load_sentiment_pipeline(pipeline, token, local_only)
+            if self.generator is not None and LLM_ASSISTED_GENERATION and loaded_model_name == LLM_MODEL_NAME:
+                self._load_assistant(AutoTokenizer, AutoModelForCausalLM, kwargs)
             self.models_ready = self.generator is not None
             if not self.models_ready:
                 self.model_error = "Geen bruikbaar LLM-model gevonden."
@@ -146,14 +485,54 @@ class LlmEngine:
             self._debug(self.model_error)
             self._debug(f"TRACE:{traceback.format_exc()}")
 
+    def _ensure_backend_locked(self) -> None:
+        if self.backend.local and self._should_disable_local_llm_by_default():
+            self.disable_model_loading = True
+            if not self.model_error:
+                self.model_error = "Lokale LLM is expliciet uitgeschakeld via NIER_DISABLE_LOCAL_LLM=1."
+                self._debug(self.model_error)
+            return
+        if self.models_ready or self.disable_model_loading or time.monotonic() < self._backend_retry_at:
+            return
+        try:
+            self._set_load_state(LOAD_WEIGHTS, self.backend.name)
+            self.loaded_model_name = self.backend.load()
+            self.load_profile = self.backend.name
+        except Exception as exc:
+            self._backend_retry_at = time.monotonic() + _BACKEND_RETRY_S
+            self.model_error = f"Backend {self.backend.name} niet beschikbaar: {exc}"
+            self._debug(self.model_error)
+            self._debug(f"TRACE:{traceback.format_exc()}")
+            return
+        self.model_error = ""
+        self.models_ready = True
+        try:
+            sentiment = self.backend.sentiment_pipeline()
+        except Exception as exc:
+            sentiment = None
+            self._debug(f"Sentiment model laden faalde: {exc}")
+        if sentiment is not None:
+            self.sentiment = sentiment
+            self.sentiment_service.set_pipeline(sentiment)
+            return
+        try:
+            from transformers import pipeline
+        except Exception as exc:
+            # Sentiment is optional; emotions then use the neutral default score.
+            self._debug(f"Sentiment niet beschikbaar zonder transformers: {exc}")
+            return
+        self._load_sentiment_pipeline(pipeline, os.getenv("HF_TOKEN", "").strip(), not LLM_ALLOW_DOWNLOAD)
+
     def _load_generator_with_fallback(
         self, auto_tokenizer, auto_model, pipeline, kwargs: dict
     ) -> str:
         tried = []
         for model_name in self._candidate_model_names():
             try:
+                self._set_load_state(LOAD_TOKENIZER, model_name)
                 tokenizer = auto_tokenizer.from_pretrained(model_name, **kwargs)
-                model = auto_model.from_pretrained(model_name, **kwargs)
+                self._set_load_state(LOAD_WEIGHTS, model_name)
+                model = self._load_causal_lm(auto_model, model_name, kwargs)
                 self.generator = pipeline(
                     "text-generation", model=model, tokenizer=tokenizer, device=-1
                 )
@@ -175,6 +554,54 @@ class LlmEngine:
             self.model_error = f"Model laden faalde voor alle kandidaten: {details}"
         return ""
 
+    def _load_assistant(self, auto_tokenizer, auto_model, kwargs: dict) -> None:
+        # Best effort: without a draft model the primary simply generates on its own.
+        names = [LLM_ASSISTANT_MODEL_NAME] if LLM_ASSISTANT_MODEL_NAME else LLM_FALLBACK_MODEL_NAMES
+        tokenizer = self.generator.tokenizer
+        profile = "bf16" if self.load_profile == "int8" else self.load_profile or "fp32"
+        for name in names:
+            if not name or name == self.loaded_model_name:
+                continue
+            if not self._fits_in_memory(name, kwargs, profile):
+                self._debug(f"TRACE:Draft model {name} past niet meer in het geheugen; overgeslagen")
+                continue
+            try:
+                self._set_load_state(LOAD_WEIGHTS, f"{name} (draft)")
+                assistant_tokenizer = auto_tokenizer.from_pretrained(name, **kwargs)
+                assistant = auto_model.from_pretrained(name, **kwargs, **self._profile_kwargs(profile))
+            except Exception as exc:
+                self._debug(f"Draft model laden faalde ({name}): {exc}")
+                gc.collect()
+                continue
+            self.assistant_model = assistant
+            same_vocab = assistant_tokenizer.get_vocab() == tokenizer.get_vocab()
+            # Different vocabularies need universal assisted decoding, which re-tokenizes the draft text.
+            self.assistant_tokenizer = None if same_vocab else assistant_tokenizer
+            self.assistant_model_name = name
+            self._debug(f"Assisted generation actief met draft model {name}")
+            return
+
+    def _assistant_kwargs(self, tokenizer) -> dict:
+        kwargs = {"assistant_model": self.assistant_model}
+        if self.assistant_tokenizer is not None:
+            kwargs["tokenizer"] = tokenizer
+            kwargs["assistant_tokenizer"] = self.assistant_tokenizer
+        return kwargs
+
+    def _disable_assistant(self, reason: str = "") -> None:
+        if reason:
+            self._debug(f"TRACE:{reason}")
+        self.assistant_model = None
+        self.assistant_tokenizer = None
+        self.assistant_model_name = ""
+        gc.collect()
+
+    def _model_detail(self) -> str:
+        detail = f"{self.loaded_model_name} [{self.load_profile}]"
+        if self.assistant_model_name:
+            detail += f" + draft {self.assistant_model_name}"
+        return detail
+
     def _load_sentiment_pipeline(self, pipeline, token: str, local_only: bool) -> None:
         sent_kwargs = {
             "model": SENTIMENT_MODEL_NAME,
@@ -188,8 +615,11 @@ class LlmEngine:
         except Exception as exc:
             # Sentiment is optional; keep chat available when this load fails.
             self.sentiment = None
+            self.sentiment_service.set_pipeline(None)
             self._debug(f"Sentiment model laden faalde: {exc}")
             self._debug(f"TRACE:{traceback.format_exc()}")
+            return
+        self.sentiment_service.set_pipeline(self.sentiment)
 
     def _candidate_model_names(self) -> list[str]:
         primary_first_env = os.getenv("NIER_PREFER_PRIMARY_MODEL", "").strip().lower()
@@ -220,6 +650,7 @@ class LlmEngine:
                 f"Generatie faalde op {self.loaded_model_name}; probeer kleiner model: {next_model}"
             )
             self.generator = None
+            self._disable_assistant()
             self.models_ready = False
             self.model_error = ""
             if next_model not in LLM_FALLBACK_MODEL_NAMES:
@@ -243,26 +674,178 @@ class LlmEngine:
             kwargs = {"local_files_only": local_only}
             if token:
                 kwargs["token"] = token
+            self._set_load_state(LOAD_TOKENIZER, model_name)
             tokenizer = AutoTokenizer.from_pretrained(model_name, **kwargs)
-            model = AutoModelForCausalLM.from_pretrained(model_name, **kwargs)
+            self._set_load_state(LOAD_WEIGHTS, model_name)
+            model = self._load_causal_lm(AutoModelForCausalLM, model_name, kwargs)
             self.generator = pipeline(
                 "text-generation", model=model, tokenizer=tokenizer, device=-1
             )
             self._load_sentiment_pipeline(pipeline, token, local_only)
             self.models_ready = True
             self.last_fallback = model_name
+            self._set_load_state(LOAD_READY, f"{model_name} [{self.load_profile}]")
             return True
         except Exception as exc:
             if self._is_resource_error(exc):
                 self.disable_model_loading = True
                 self.model_error = "LLM uitgeschakeld: te weinig schijfruimte of virtueel geheugen."
                 self._debug(self.model_error)
+                self._set_load_state(LOAD_FAILED, self.model_error)
                 return False
             self.model_error = f"Fallback laden faalde: {exc}"
             self._debug(self.model_error)
             self._debug(f"TRACE:{traceback.format_exc()}")
+            self._set_load_state(LOAD_FAILED, self.model_error)
             return False
 
+    def _load_causal_lm(self, auto_model, model_name: str, kwargs: dict):
+        if LLM_LOAD_PROFILE == LOAD_PROFILE_LOW_MEM:
+            candidates = (LOAD_PROFILE_LOW_MEM,)
+        else:
+            profile = LLM_LOAD_PROFILE if LLM_LOAD_PROFILE in LOAD_PROFILES else self._pick_load_profile(model_name, kwargs)
+            candidates = LOAD_PROFILES[LOAD_PROFILES.index(profile) :]
+        for candidate in candidates:
+            try:
+                model = auto_model.from_pretrained(model_name, **kwargs, **self._profile_kwargs(candidate))
+                if candidate == "int8":
+                    self._quantize_linear_int8(model)
+                self.load_profile = candidate
+                return model
+            except Exception as exc:
+                if not self._is_resource_error(exc) or candidate == candidates[-1]:
+                    raise
+                self._debug(f"Laadprofiel {candidate} te groot voor {model_name}; probeer kleiner profiel.")
+                model = None
+                gc.collect()
+        raise RuntimeError(f"Geen laadprofiel bruikbaar voor {model_name}")
+
+    def _pick_load_profile(self, model_name: str, kwargs: dict) -> str:
+        available = self._available_memory_bytes()
+        params = self._model_parameters(model_name, kwargs)
+        if not available or not params:
+            return "fp32"
+        # int8 is the smallest resident size; if even that does not fit, loading it is still the best try.
+        profile = LOAD_PROFILES[-1]
+        for candidate in LOAD_PROFILES:
+            if params * _PROFILE_BYTES_PER_PARAM[candidate] * _MEMORY_MARGIN <= available:
+                profile = candidate
+                break
+        self._debug(
+            f"TRACE:Laadprofiel {profile} voor {model_name}: "
+            f"~{params / 1e9:.1f}B parameters, {available / 2**30:.1f} GB RAM vrij"
+        )
+        return profile
+
+    def _fits_in_memory(self, model_name: str, kwargs: dict, profile: str) -> bool:
+        available = self._available_memory_bytes()
+        params = self._model_parameters(model_name, kwargs)
+        if not available or not params:
+            return True
+        return params * _PROFILE_BYTES_PER_PARAM.get(profile, 4.0) * _MEMORY_MARGIN <= available
+
+    def _model_parameters(self, model_name: str, kwargs: dict) -> int | None:
+        try:
+            from transformers import AutoConfig
+
+            return self._estimate_parameters(AutoConfig.from_pretrained(model_name, **kwargs))
+        except Exception as exc:
+            self._debug(f"TRACE:Modelconfig lezen faalde ({model_name}): {exc}")
+            return None
+
+    @staticmethod
+    def _profile_kwargs(profile: str) -> dict:
+        if profile == "fp32":
+            return {}
+        import torch
+
+        kwargs = {"torch_dtype": torch.bfloat16}
+        if profile == LOAD_PROFILE_LOW_MEM:
+            # Keep the checkpoint dtype so safetensors weights can stay memory-mapped.
+            kwargs["torch_dtype"] = "auto"
+        if importlib.util.find_spec("accelerate") is not None:
+            kwargs["low_cpu_mem_usage"] = True
+        return kwargs
+
+    @staticmethod
+    def _quantize_linear_int8(model) -> None:
+        import torch
+        from torch import nn
+
+        layers = None
+        depth = getattr(model.config, "num_hidden_layers", None)
+        for module in model.modules():
+            if isinstance(module, nn.ModuleList) and len(module) == depth:
+                layers = module
+                break
+        if layers is None:
+            model.float()
+            torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8, inplace=True)
+            return
+        # Convert one decoder block at a time so peak memory stays near the bf16 load.
+        for block in layers:
+            block.float()
+            torch.ao.quantization.quantize_dynamic(block, {nn.Linear}, dtype=torch.qint8, inplace=True)
+        # Embeddings, final norm and the (tied) lm_head stay unquantized in fp32.
+        model.float()
+
+    @staticmethod
+    def _estimate_parameters(config) -> int | None:
+        hidden = getattr(config, "hidden_size", None)
+        depth = getattr(config, "num_hidden_layers", None)
+        intermediate = getattr(config, "intermediate_size", None)
+        vocab = getattr(config, "vocab_size", None)
+        if not (hidden and depth and intermediate and vocab):
+            return None
+        heads = getattr(config, "num_attention_heads", None) or 1
+        kv_heads = getattr(config, "num_key_value_heads", None) or heads
+        head_dim = getattr(config, "head_dim", None) or hidden // heads
+        attention = 2 * hidden * heads * head_dim + 2 * hidden * kv_heads * head_dim
+        mlp = 3 * hidden * intermediate
+        embeddings = vocab * hidden * (1 if getattr(config, "tie_word_embeddings", True) else 2)
+        return depth * (attention + mlp) + embeddings
+
+    @staticmethod
+    def _available_memory_bytes() -> int | None:
+        try:
+            import psutil
+
+            return int(psutil.virtual_memory().available)
+        except Exception:
+            pass
+        if os.name == "nt":
+            try:
+                import ctypes
+
+                class _MemoryStatus(ctypes.Structure):
+                    _fields_ = [
+                        ("dwLength", ctypes.c_ulong),
+                        ("dwMemoryLoad", ctypes.c_ulong),
+                        ("ullTotalPhys", ctypes.c_ulonglong),
+                        ("ullAvailPhys", ctypes.c_ulonglong),
+                        ("ullTotalPageFile", ctypes.c_ulonglong),
+                        ("ullAvailPageFile", ctypes.c_ulonglong),
+                        ("ullTotalVirtual", ctypes.c_ulonglong),
+                        ("ullAvailVirtual", ctypes.c_ulonglong),
+                        ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+                    ]
+
+                status = _MemoryStatus()
+                status.dwLength = ctypes.sizeof(_MemoryStatus)
+                if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                    return int(status.ullAvailPhys)
+            except Exception:
+                return None
+            return None
+        try:
+            with open("/proc/meminfo", encoding="ascii") as meminfo:
+                for line in meminfo:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) * 1024
+        except (OSError, ValueError, IndexError):
+            return None
+        return None
+
     def _load_hf_token(self) -> str:
         env_token = os.getenv("HF_TOKEN") or os.getenv("HUGGINGFACE_TOKEN")
         if env_token:
@@ -405,21 +988,16 @@ class LlmEngine:
         self._debug(f"{code}: {detail}")
         return self._local_fallback_response("")
 
-    def _local_fallback_response(self, message: str, emotions: dict | None = None) -> str:
+    def _local_fallback_response(self, message: str, emotions: dict | None = None, intents=None) -> str:
         msg = (message or "").strip()
-        lowered = msg.lower()
         emotions = emotions or {}
         dominant = max(emotions.items(), key=lambda kv: kv[1])[0] if emotions else ""
+        intents = intents or self.intent_router.match(msg)
 
-        if any(w in lowered for w in ("hallo", "hey", "hoi", "goeiemorgen", "goedemorgen", "goedenavond")):
-            return "Hey, ik ben er. Vertel, waar heb je nu zin in?"
-        if any(w in lowered for w in ("hoe gaat", "gaat het", "alles goed")):
-            return "Met mij gaat het goed. Met jou ook?"
-        if any(w in lowered for w in ("honger", "eten", "snoep", "food")):
-            return "Ik heb altijd zin in een snack. Wat staat er op het menu?"
-        if any(w in lowered for w in ("moe", "slapen", "slaap")):
-            return "Een powernap klinkt goed. Maar ik kan nog even door."
-        if "?" in lowered or lowered.startswith(("waarom", "hoe", "wat", "wanneer", "wie", "welke")):
+        canned = self.intent_router.fallback_for(intents)
+        if canned:
+            return canned
+        if intents.has("question"):
             topic = self._extract_topic(msg)
             if topic:
                 return f"Goede vraag over {topic}. Ik kan het simpel uitleggen als je wil."
@@ -459,6 +1037,7 @@ class LlmEngine:
             "insufficient memory",
             "there is not enough space",
             "there is not enough memory",
+            "can't allocate memory",
         )
         return any(marker in text for marker in markers)
 
@@ -470,20 +1049,14 @@ class LlmEngine:
     def _truncate_reply(self, text: str) -> str:
         if not text:
             return text
-        parts = []
-        for chunk in text.replace("!", ".").replace("?", ".").split("."):
-            chunk = chunk.strip()
-            if chunk:
-                parts.append(chunk)
-            if len(parts) >= 2:
-                break
+        parts = sentence_chunks(text)[:MAX_REPLY_SENTENCES]
         if parts:
             text = ". ".join(parts).strip()
             if not text.endswith("."):
                 text += "."
         words = text.split()
-        if len(words) > 20:
-            text = " ".join(words[:20]).rstrip()
+        if len(words) > MAX_REPLY_WORDS:
+            text = " ".join(words[:MAX_REPLY_WORDS]).rstrip()
             if not text.endswith("."):
                 text += "."
         lowered = text.lower().strip()
@@ -0,0 +1,488 @@
+import itertools
+import json
+import multiprocessing
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from config import (
+    LLM_BACKEND_API_KEY,
+    LLM_BACKEND_MODEL,
+    LLM_BACKEND_TIMEOUT_S,
+    LLM_BACKEND_URL,
+    LLM_ONNX_MODEL_DIR,
+    LLM_ONNX_SENTIMENT_DIR,
+    LLM_WORKER_BACKEND,
+    LLM_WORKER_HEALTH_INTERVAL_S,
+    LLM_WORKER_PING_TIMEOUT_S,
+)
+from reply_text import reply_is_complete
+
+
+BACKEND_TRANSFORMERS = "transformers"
+BACKEND_ONNX = "onnx"
+BACKEND_OPENAI = "openai"
+BACKEND_PROCESS = "process"
+BACKENDS = (BACKEND_TRANSFORMERS, BACKEND_ONNX, BACKEND_OPENAI, BACKEND_PROCESS)
+# Load states forwarded from the worker while it loads; the engine sets WARMING/READY itself.
+_FORWARDED_STATES = ("IMPORTING", "LOADING_TOKENIZER", "LOADING_WEIGHTS")
+_MAX_RESTART_DELAY_S = 60.0
+
+
+def make_stopping_criteria(event: threading.Event, request=None, tokenizer=None, prompt_length: int = 0):
+    """StoppingCriteriaList that ends generate() once event is set or the request should stop.
+
+    With a tokenizer it also stops as soon as the reply is complete (newline, sentence or word limit),
+    instead of generating up to max_new_tokens and truncating afterwards.
+    """
+    from transformers import StoppingCriteria, StoppingCriteriaList
+
+    class _StopWhenSet(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs) -> bool:
+            return event.is_set() or (request is not None and request.should_stop())
+
+    class _ReplyComplete(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs) -> bool:
+            return reply_is_complete(tokenizer.decode(input_ids[0][prompt_length:], skip_special_tokens=True))
+
+    criteria = [_StopWhenSet()]
+    if tokenizer is not None:
+        criteria.append(_ReplyComplete())
+    return StoppingCriteriaList(criteria)
+
+
+def hf_generate_kwargs(params: dict, tokenizer) -> dict:
+    kwargs = {
+        "max_new_tokens": params["max_new_tokens"],
+        "min_new_tokens": params["min_new_tokens"],
+        "do_sample": True,
+        "temperature": params["temperature"],
+        "top_p": params["top_p"],
+        "repetition_penalty": params["repetition_penalty"],
+    }
+    if tokenizer.pad_token_id is None and tokenizer.eos_token_id is not None:
+        kwargs["pad_token_id"] = tokenizer.eos_token_id
+    return kwargs
+
+
+class InferenceBackend:
+    """Text generation behind LlmEngine; prompts are plain text, replies are streamed as text chunks."""
+
+    name = ""
+    # Runs a model on this machine (NIER_DISABLE_LOCAL_LLM applies).
+    local = True
+    # Set by LlmEngine: state_cb(load_state, detail) and debug_cb(message).
+    state_cb = None
+    debug_cb = None
+
+    def load(self) -> str:
+        """Load or connect; returns the model description for the UI. Raises on failure."""
+        raise NotImplementedError
+
+    def stream(self, prompt: str, params: dict, request=None):
+        raise NotImplementedError
+
+    def warm_up(self, prompt: str, params: dict) -> None:
+        for _chunk in self.stream(prompt, dict(params, max_new_tokens=1, min_new_tokens=1)):
+            pass
+
+    def count_tokens(self, text: str) -> int | None:
+        return None
+
+    def sentiment_pipeline(self):
+        """Callable with the transformers pipeline contract (texts -> [{"label": "4 stars"}]), or None."""
+        return None
+
+    def close(self) -> None:
+        pass
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """Causal LM exported to ONNX, run through optimum's ONNX Runtime models on the CPU provider."""
+
+    name = BACKEND_ONNX
+
+    def __init__(self, model_dir: str = LLM_ONNX_MODEL_DIR, sentiment_dir: str = LLM_ONNX_SENTIMENT_DIR) -> None:
+        self.model_dir = model_dir
+        self.sentiment_dir = sentiment_dir
+        self.model = None
+        self.tokenizer = None
+
+    def load(self) -> str:
+        if not self.model_dir:
+            raise ValueError("geen onnx_model_dir ingesteld")
+        from optimum.onnxruntime import ORTModelForCausalLM
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+        self.model = ORTModelForCausalLM.from_pretrained(self.model_dir, provider="CPUExecutionProvider")
+        return Path(self.model_dir).name or self.model_dir
+
+    def stream(self, prompt: str, params: dict, request=None):
+        from transformers import TextIteratorStreamer
+
+        inputs = self.tokenizer(prompt, return_tensors="pt")
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        stop_event = threading.Event()
+        errors = []
+
+        def _generate() -> None:
+            kwargs = hf_generate_kwargs(params, self.tokenizer)
+            try:
+                criteria = make_stopping_criteria(
+                    stop_event, request, tokenizer=self.tokenizer, prompt_length=inputs["input_ids"].shape[-1]
+                )
+                self.model.generate(**inputs, streamer=streamer, stopping_criteria=criteria, **kwargs)
+            except Exception as exc:
+                errors.append(exc)
+                streamer.end()
+
+        worker = threading.Thread(target=_generate, name="onnx-generate", daemon=True)
+        worker.start()
+        try:
+            yield from streamer
+        finally:
+            stop_event.set()
+            worker.join()
+        if errors:
+            raise errors[0]
+
+    def count_tokens(self, text: str) -> int | None:
+        if self.tokenizer is None:
+            return None
+        return len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def sentiment_pipeline(self):
+        if not self.sentiment_dir:
+            return None
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        from transformers import AutoTokenizer, pipeline
+
+        model = ORTModelForSequenceClassification.from_pretrained(self.sentiment_dir, provider="CPUExecutionProvider")
+        tokenizer = AutoTokenizer.from_pretrained(self.sentiment_dir)
+        return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+
+
+class OpenAICompatibleBackend(InferenceBackend):
+    """Client for a local OpenAI-compatible server (llama.cpp server, vLLM, ...) via /v1/completions."""
+
+    name = BACKEND_OPENAI
+    local = False
+
+    def __init__(
+        self,
+        base_url: str = LLM_BACKEND_URL,
+        model: str = LLM_BACKEND_MODEL,
+        api_key: str = LLM_BACKEND_API_KEY,
+        timeout_s: float = LLM_BACKEND_TIMEOUT_S,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+        self.timeout_s = timeout_s
+
+    def load(self) -> str:
+        with self._open("GET", "/models") as response:
+            payload = json.loads(response.read().decode("utf-8"))
+        models = [item.get("id", "") for item in payload.get("data", []) if isinstance(item, dict)]
+        if not self.model:
+            if not models:
+                raise ValueError(f"server op {self.base_url} meldt geen modellen")
+            self.model = models[0]
+        return f"{self.model} @ {self.base_url}"
+
+    def stream(self, prompt: str, params: dict, request=None):
+        body = {
+            "model": self.model,
+            "prompt": prompt,
+            "max_tokens": params["max_new_tokens"],
+            "temperature": params["temperature"],
+            "top_p": params["top_p"],
+            # Only the first reply line is used.
+            "stop": ["\n"],
+            "stream": True,
+        }
+        with self._open("POST", "/completions", body) as response:
+            for raw in response:
+                if request is not None and request.should_stop():
+                    return
+                line = raw.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    return
+                choices = json.loads(data).get("choices") or [{}]
+                text = choices[0].get("text") or ""
+                if text:
+                    yield text
+
+    def _open(self, method: str, path: str, body: dict | None = None):
+        headers = {"Accept": "application/json"}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            return urllib.request.urlopen(req, timeout=self.timeout_s)
+        except urllib.error.HTTPError as exc:
+            detail = exc.read().decode("utf-8", "replace")[:200]
+            raise RuntimeError(f"HTTP {exc.code} van {self.base_url}{path}: {detail}") from exc
+
+
+class ProcessBackend(InferenceBackend):
+    """Runs another backend in a child process so torch never loads into the GUI process.
+
+    A health thread pings the worker; a worker that crashes, is OOM-killed or stops answering
+    is restarted with backoff and reloaded, while the engine answers with fallbacks.
+    """
+
+    name = BACKEND_PROCESS
+
+    def __init__(
+        self,
+        inner: str = LLM_WORKER_BACKEND,
+        health_interval_s: float = LLM_WORKER_HEALTH_INTERVAL_S,
+        ping_timeout_s: float = LLM_WORKER_PING_TIMEOUT_S,
+    ) -> None:
+        self.inner = inner if inner != BACKEND_PROCESS else BACKEND_TRANSFORMERS
+        self.health_interval_s = max(1.0, float(health_interval_s))
+        self.ping_timeout_s = max(1.0, float(ping_timeout_s))
+        self.restarts = 0
+        self.description = ""
+        self._process = None
+        self._conn = None
+        self._send_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._ids = itertools.count(1)
+        # Automatic restarts only once a load has succeeded; before that LlmEngine retries load().
+        self._ready = False
+        self._restarting = False
+        self._closed = False
+        self._health_thread = None
+
+    def load(self) -> str:
+        self._closed = False
+        if not self._alive():
+            self._start()
+        name, profile = self._call("load")
+        self.description = f"{name} ({profile})" if profile else name
+        self._ready = True
+        self._ensure_health_thread()
+        return self.description
+
+    def warm_up(self, prompt: str, params: dict) -> None:
+        self._call("warm_up")
+
+    def stream(self, prompt: str, params: dict, request=None):
+        request_id, replies = self._register()
+        finished = False
+        cancel_sent = False
+        try:
+            self._send(request_id, "generate", (prompt, params))
+            while True:
+                if request is not None and request.should_stop():
+                    # The worker keeps generating until it hears about the cancel.
+                    cancel_sent = self._send_cancel(request_id)
+                    return
+                try:
+                    kind, payload = replies.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+                if kind == "chunk":
+                    yield payload
+                elif kind == "done":
+                    finished = True
+                    return
+                else:
+                    finished = True
+                    raise RuntimeError(payload)
+        finally:
+            if not finished and not cancel_sent:
+                self._send_cancel(request_id)
+            self._unregister(request_id)
+
+    def _send_cancel(self, request_id: int) -> bool:
+        # Also runs from finally blocks: a dead worker must not hide the original exception.
+        try:
+            self._send(0, "cancel", request_id)
+        except (RuntimeError, OSError, EOFError, ValueError):
+            return False
+        return True
+
+    def sentiment_pipeline(self):
+        def _score(texts, **_kwargs):
+            scores = self._call("sentiment", list(texts))
+            return [{"label": f"{score} stars"} for score in scores]
+
+        return _score
+
+    def close(self) -> None:
+        self._closed = True
+        process = self._process
+        if process is None:
+            return
+        self._send(0, "shutdown")
+        process.join(timeout=2.0)
+        if process.is_alive():
+            process.terminate()
+
+    def _alive(self) -> bool:
+        return self._process is not None and self._process.is_alive()
+
+    def _start(self) -> None:
+        from inference_worker import worker_main
+
+        # spawn everywhere: forking a process that runs Tk and serial threads is not safe.
+        ctx = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = ctx.Pipe()
+        process = ctx.Process(target=worker_main, args=(child_conn, self.inner), name="nier-inference", daemon=True)
+        process.start()
+        child_conn.close()
+        self._conn, self._process = parent_conn, process
+        threading.Thread(target=self._reader, args=(parent_conn, process), name="inference-reader", daemon=True).start()
+        self._debug(f"Inference proces gestart (pid {process.pid}, backend {self.inner})")
+
+    def _reader(self, conn, process) -> None:
+        while True:
+            try:
+                request_id, kind, payload = conn.recv()
+            except (EOFError, OSError):
+                break
+            if request_id == 0:
+                if kind == "state" and payload[0] in _FORWARDED_STATES and self.state_cb:
+                    self.state_cb(*payload)
+                elif kind == "debug":
+                    self._debug(payload)
+                continue
+            with self._lock:
+                replies = self._pending.get(request_id)
+            if replies is not None:
+                replies.put((kind, payload))
+        process.join(timeout=1.0)
+        self._on_worker_lost(process)
+
+    def _on_worker_lost(self, process) -> None:
+        with self._lock:
+            if process is not self._process:
+                return
+            pending = list(self._pending.values())
+        for replies in pending:
+            replies.put(("error", f"inference proces gestopt (exitcode {process.exitcode})"))
+        if self._closed:
+            return
+        self._debug(f"Inference proces gestopt (exitcode {process.exitcode})")
+        if self._ready:
+            self._schedule_restart()
+
+    def _schedule_restart(self) -> None:
+        with self._lock:
+            if self._restarting:
+                return
+            self._restarting = True
+        threading.Thread(target=self._restart_loop, name="inference-restart", daemon=True).start()
+
+    def _restart_loop(self) -> None:
+        try:
+            while not self._closed:
+                delay = min(_MAX_RESTART_DELAY_S, 2.0 ** min(self.restarts, 6))
+                self.restarts += 1
+                self._set_state("LOADING_WEIGHTS", f"herstart {self.restarts}")
+                time.sleep(delay)
+                try:
+                    if self._alive():
+                        self._process.kill()
+                        self._process.join(timeout=2.0)
+                    self._start()
+                    self._call("load")
+                    self._set_state("WARMING", self.description)
+                    self._call("warm_up")
+                except Exception as exc:
+                    self._debug(f"Herstart inference proces faalde: {exc}")
+                    self._set_state("FAILED", str(exc))
+                    continue
+                self._set_state("READY", self.description)
+                return
+        finally:
+            with self._lock:
+                self._restarting = False
+
+    def _ensure_health_thread(self) -> None:
+        if self._health_thread is not None and self._health_thread.is_alive():
+            return
+        self._health_thread = threading.Thread(target=self._health_loop, name="inference-health", daemon=True)
+        self._health_thread.start()
+
+    def _health_loop(self) -> None:
+        while not self._closed:
+            time.sleep(self.health_interval_s)
+            if self._restarting or self._closed:
+                continue
+            process = self._process
+            if process is None or not process.is_alive():
+                self._schedule_restart()
+                continue
+            try:
+                self._call("ping", timeout=self.ping_timeout_s)
+            except Exception as exc:
+                # Hung (e.g. stuck in native code): kill it; the reader then schedules the restart.
+                self._debug(f"Inference proces reageert niet ({exc}); herstarten")
+                process.kill()
+
+    def _call(self, op: str, payload=None, timeout: float | None = None):
+        request_id, replies = self._register()
+        try:
+            self._send(request_id, op, payload)
+            try:
+                kind, result = replies.get(timeout=timeout)
+            except queue.Empty:
+                raise TimeoutError(f"geen antwoord op '{op}' binnen {timeout} s") from None
+            if kind == "error":
+                raise RuntimeError(result)
+            return result
+        finally:
+            self._unregister(request_id)
+
+    def _register(self) -> tuple[int, queue.Queue]:
+        replies = queue.Queue()
+        with self._lock:
+            request_id = next(self._ids)
+            self._pending[request_id] = replies
+        return request_id, replies
+
+    def _unregister(self, request_id: int) -> None:
+        with self._lock:
+            self._pending.pop(request_id, None)
+
+    def _send(self, request_id: int, op: str, payload=None) -> None:
+        conn = self._conn
+        if conn is None or not self._alive():
+            raise RuntimeError("inference proces draait niet")
+        with self._send_lock:
+            conn.send((request_id, op, payload))
+
+    def _set_state(self, state: str, detail: str) -> None:
+        if self.state_cb:
+            self.state_cb(state, detail)
+
+    def _debug(self, message: str) -> None:
+        if self.debug_cb:
+            self.debug_cb(message)
+
+
+def create_backend(name: str) -> InferenceBackend | None:
+    """Backend for the llm.backend setting; None means LlmEngine's built-in transformers pipeline."""
+    if name == BACKEND_PROCESS:
+        return ProcessBackend()
+    if name == BACKEND_ONNX:
+        return OnnxRuntimeBackend()
+    if name == BACKEND_OPENAI:
+        return OpenAICompatibleBackend()
+    return None
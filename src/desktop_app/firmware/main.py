@@ -1,4 +1,5 @@
 import faulthandler
+import multiprocessing
 from datetime import datetime
 from pathlib import Path
 
@@ -19,5 +20,7 @@ def _enable_native_crash_logging() -> None:
 
 
 if __name__ == "__main__":
+    # Frozen builds re-run this executable for the inference worker process.
+    multiprocessing.freeze_support()
     _enable_native_crash_logging()
     run_app()
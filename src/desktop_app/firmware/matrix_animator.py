@@ -0,0 +1,179 @@
+import random
+import threading
+import time
+
+from config import (
+    LED_MATRIX_BLINK_DURATION_MS,
+    LED_MATRIX_BLINK_INTERVAL_MS,
+    LED_MATRIX_BLINK_JITTER_MS,
+    LED_MATRIX_IDLE_BLINK,
+    LED_MATRIX_MAX_BYTES_PER_S,
+)
+from led_matrix_frame import FRAME_ROWS, FRAME_SEGMENTS, MatrixFrame
+from led_matrix_store import matrix_commands_for_frame
+
+
+def blink_frame(frame: MatrixFrame) -> MatrixFrame:
+    # Closed eyes: every lit column collapses into a single line.
+    collapsed = 0
+    for value in frame.rows24():
+        collapsed |= value
+    rows = [0] * FRAME_ROWS
+    rows[FRAME_ROWS // 2] = collapsed
+    return MatrixFrame.from_rows24(rows)
+
+
+class MatrixAnimator:
+    """Plays LED matrix frame sequences on a monotonic clock, sending only changed segments within a byte budget."""
+
+    def __init__(self, send_line, encoded_size, animations: dict) -> None:
+        self.send_line = send_line
+        self.encoded_size = encoded_size
+        self.animations = animations
+        self.bytes_per_s = max(20.0, float(LED_MATRIX_MAX_BYTES_PER_S))
+        # One full three-segment ASCII update has to fit in a burst.
+        self.burst_bytes = max(self.bytes_per_s / 2.0, 128.0)
+        self.idle_blink = LED_MATRIX_IDLE_BLINK
+        self.dropped_frames = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._running = False
+        self._emotion = ""
+        self._frames: list[tuple[MatrixFrame, float]] = []
+        self._loop = False
+        self._index = 0
+        self._frame_until = None
+        self._shown = MatrixFrame()
+        self._unknown = set(range(FRAME_SEGMENTS))
+        self._tokens = self.burst_bytes
+        self._tokens_at = time.monotonic()
+        self._blink_at = 0.0
+        self._blink_until = 0.0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="matrix-animator", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._running = False
+            thread = self._thread
+            self._thread = None
+        self._wake.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=1.0)
+
+    def play(self, emotion: str) -> bool:
+        with self._lock:
+            if emotion == self._emotion and self._frames:
+                return False
+            sequence = self.animations.get(emotion)
+            if not sequence or not sequence[0]:
+                return False
+            self._emotion = emotion
+            self._frames, self._loop = sequence
+            self._index = 0
+            now = time.monotonic()
+            self._frame_until = now + self._frames[0][1] if len(self._frames) > 1 else None
+            self._schedule_blink_locked(now)
+        self._wake.set()
+        return True
+
+    def set_animations(self, animations: dict) -> None:
+        with self._lock:
+            self.animations = animations
+            emotion = self._emotion
+            self._emotion = ""
+            self._frames = []
+        if emotion:
+            self.play(emotion)
+
+    def reset(self) -> None:
+        # The robot no longer shows what we last sent (connect/reset): stop playing and resend every segment later.
+        with self._lock:
+            self._emotion = ""
+            self._frames = []
+            self._frame_until = None
+            self._unknown = set(range(FRAME_SEGMENTS))
+        self._wake.set()
+
+    def _schedule_blink_locked(self, now: float) -> None:
+        jitter = random.uniform(0.0, max(0, LED_MATRIX_BLINK_JITTER_MS) / 1000.0)
+        self._blink_at = now + max(500, LED_MATRIX_BLINK_INTERVAL_MS) / 1000.0 + jitter
+        self._blink_until = 0.0
+
+    def _animating_locked(self) -> bool:
+        return self._frame_until is not None
+
+    def _target_locked(self, now: float) -> MatrixFrame | None:
+        if not self._frames:
+            return None
+        if self._frame_until is not None and now >= self._frame_until:
+            skipped = -1
+            while self._frame_until is not None and now >= self._frame_until:
+                skipped += 1
+                self._index += 1
+                if self._index >= len(self._frames):
+                    if not self._loop:
+                        self._index = len(self._frames) - 1
+                        self._frame_until = None
+                        self._schedule_blink_locked(now)
+                        break
+                    self._index = 0
+                self._frame_until += self._frames[self._index][1]
+            self.dropped_frames += max(0, skipped)
+        frame = self._frames[self._index][0]
+        if self.idle_blink and not self._animating_locked():
+            if now >= self._blink_at and not self._blink_until:
+                self._blink_until = now + max(40, LED_MATRIX_BLINK_DURATION_MS) / 1000.0
+            if self._blink_until:
+                if now < self._blink_until:
+                    return blink_frame(frame)
+                self._schedule_blink_locked(now)
+        return frame
+
+    def _next_wake_locked(self, now: float) -> float:
+        deadlines = []
+        if self._frame_until is not None:
+            deadlines.append(self._frame_until)
+        elif self.idle_blink and self._frames:
+            deadlines.append(self._blink_until or self._blink_at)
+        if not deadlines:
+            return 1.0
+        return max(0.0, min(deadlines) - now)
+
+    def _run(self) -> None:
+        while True:
+            lines = []
+            with self._lock:
+                if not self._running:
+                    return
+                now = time.monotonic()
+                self._tokens = min(self.burst_bytes, self._tokens + (now - self._tokens_at) * self.bytes_per_s)
+                self._tokens_at = now
+                target = self._target_locked(now)
+                wait = self._next_wake_locked(now)
+                if target is not None:
+                    pending = sorted(self._unknown.union(target.changed_segments(self._shown)))
+                    sent = []
+                    for seg, line in zip(pending, matrix_commands_for_frame(target, pending)):
+                        cost = self.encoded_size(line)
+                        if cost > self._tokens:
+                            # Out of budget: retry once enough tokens have refilled; newer frames replace this one.
+                            wait = min(wait, (cost - self._tokens) / self.bytes_per_s)
+                            break
+                        self._tokens -= cost
+                        sent.append(seg)
+                        lines.append(line)
+                    if sent:
+                        self._shown = self._shown.with_segments_from(target, sent)
+                        self._unknown.difference_update(sent)
+            for line in lines:
+                self.send_line(line)
+            self._wake.wait(timeout=max(0.005, wait))
+            self._wake.clear()
@@ -0,0 +1,37 @@
+MAX_REPLY_SENTENCES = 2
+MAX_REPLY_WORDS = 20
+SENTENCE_TERMINATORS = ".!?"
+CLAUSE_BOUNDARIES = ",.;:!?"
+
+
+def complete_clauses(text: str) -> str:
+    # Text up to the last clause boundary that is followed by whitespace (so "3,5" or "..." mid-token don't count).
+    for idx in range(len(text) - 2, -1, -1):
+        if text[idx] in CLAUSE_BOUNDARIES and text[idx + 1].isspace():
+            return text[: idx + 1].strip()
+    return ""
+
+
+def _unify_terminators(text: str) -> str:
+    for terminator in SENTENCE_TERMINATORS[1:]:
+        text = text.replace(terminator, SENTENCE_TERMINATORS[0])
+    return text
+
+
+def sentence_chunks(text: str) -> list[str]:
+    return [chunk.strip() for chunk in _unify_terminators(text).split(SENTENCE_TERMINATORS[0]) if chunk.strip()]
+
+
+def reply_is_complete(text: str) -> bool:
+    """True once more text can no longer change what LlmEngine._truncate_reply keeps of the first line."""
+    text = text.lstrip()
+    if "\n" in text:
+        return True
+    # Every chunk before the last terminator is finished.
+    closed = _unify_terminators(text).split(SENTENCE_TERMINATORS[0])[:-1]
+    if len([chunk for chunk in closed if chunk.strip()]) >= MAX_REPLY_SENTENCES:
+        return True
+    # Ignore the word that may still be growing, then count words the way _truncate_reply does.
+    stable = text if not text or text[-1].isspace() else text[: len(text) - len(text.split()[-1])]
+    kept = " ".join(sentence_chunks(stable)[:MAX_REPLY_SENTENCES])
+    return len(kept.split()) > MAX_REPLY_WORDS
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from config import (
+    LLM_RESPONSE_CACHE_EXPLORE,
+    LLM_RESPONSE_CACHE_PATH,
+    LLM_RESPONSE_CACHE_SIZE,
+    LLM_RESPONSE_CACHE_TTL_S,
+    LLM_RESPONSE_CACHE_VARIANTS,
+)
+from settings_loader import settings_store
+
+
+CACHE_FILE_NAME = ".nier_response_cache.json"
+# Previous lines that go into the key; enough to tell "hoi" at the start apart from "hoi" mid-conversation.
+HISTORY_FINGERPRINT_LINES = 2
+# Minimum delay between two disk writes triggered by put().
+_SAVE_INTERVAL_S = 30.0
+
+
+def normalize_prompt(text: str) -> str:
+    cleaned = "".join(ch if ch.isalnum() or ch.isspace() else " " for ch in (text or "").lower())
+    return " ".join(cleaned.split())
+
+
+def emotion_bucket(emotions: dict) -> str:
+    if not emotions:
+        return "-"
+    name, value = max(emotions.items(), key=lambda kv: kv[1])
+    try:
+        level = "hoog" if float(value) >= 66 else "mid" if float(value) >= 33 else "laag"
+    except (TypeError, ValueError):
+        level = "laag"
+    return f"{name}:{level}"
+
+
+def history_fingerprint(history: list) -> str:
+    recent = [normalize_prompt(line) for line in (history or [])[-HISTORY_FINGERPRINT_LINES:]]
+    if not recent:
+        return "-"
+    return hashlib.blake2b("\n".join(recent).encode("utf-8"), digest_size=6).hexdigest()
+
+
+def default_cache_path() -> Path:
+    if LLM_RESPONSE_CACHE_PATH:
+        return Path(LLM_RESPONSE_CACHE_PATH).expanduser()
+    if getattr(sys, "frozen", False):
+        # The bundled settings live in a temporary extraction dir; keep the cache next to the executable.
+        return Path(sys.executable).resolve().parent / CACHE_FILE_NAME
+    # Next to settings.json, independent of the working directory the app was started from.
+    return Path(settings_store().path).resolve().parent / CACHE_FILE_NAME
+
+
+class ResponseCache:
+    """LRU + TTL cache of LLM replies with a few variants per key, persisted as JSON."""
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        max_entries: int = LLM_RESPONSE_CACHE_SIZE,
+        ttl_s: float = LLM_RESPONSE_CACHE_TTL_S,
+        variants: int = LLM_RESPONSE_CACHE_VARIANTS,
+        explore: float = LLM_RESPONSE_CACHE_EXPLORE,
+        debug_cb=None,
+    ) -> None:
+        self.path = Path(path) if path is not None else default_cache_path()
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_s = max(0.0, float(ttl_s))
+        self.variants = max(1, int(variants))
+        # Chance of generating a fresh reply on a hit, so cached answers keep some diversity.
+        self.explore = min(1.0, max(0.0, float(explore)))
+        self.debug_cb = debug_cb
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> {"replies": [[reply, created_at], ...], "last": index of the variant served last}
+        self._entries = OrderedDict()
+        self._dirty = False
+        self._saved_at = time.time()
+        self._load()
+
+    @staticmethod
+    def key(message: str, history: list | None, emotions: dict | None) -> str:
+        return "|".join((normalize_prompt(message), emotion_bucket(emotions or {}), history_fingerprint(history or [])))
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                now = time.time()
+                entry["replies"] = [item for item in entry["replies"] if not self._expired(item[1], now)]
+                if not entry["replies"]:
+                    del self._entries[key]
+                    self._dirty = True
+                    entry = None
+            if entry is None or random.random() < self.explore:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            replies = entry["replies"]
+            choices = [idx for idx in range(len(replies)) if idx != entry.get("last")] or [0]
+            index = random.choice(choices)
+            entry["last"] = index
+            self.hits += 1
+            return replies[index][0]
+
+    def put(self, key: str, reply: str) -> None:
+        reply = (reply or "").strip()
+        if not reply:
+            return
+        with self._lock:
+            entry = self._entries.setdefault(key, {"replies": [], "last": None})
+            if all(item[0] != reply for item in entry["replies"]):
+                entry["replies"].append([reply, time.time()])
+                # Oldest variant makes room for the new one.
+                del entry["replies"][: -self.variants]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+            due = time.time() - self._saved_at >= _SAVE_INTERVAL_S
+        if due:
+            self.save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+
+    def stats(self) -> tuple[int, int, int]:
+        with self._lock:
+            return self.hits, self.misses, len(self._entries)
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = {"version": 1, "entries": [[key, entry["replies"]] for key, entry in self._entries.items()]}
+            self._dirty = False
+            self._saved_at = time.time()
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            self._debug(f"TRACE:Antwoordcache opslaan faalde: {exc}")
+
+    def _load(self) -> None:
+        try:
+            payload = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            self._debug(f"TRACE:Antwoordcache laden faalde: {exc}")
+            return
+        now = time.time()
+        for item in payload.get("entries", []) if isinstance(payload, dict) else []:
+            try:
+                key, replies = item
+                replies = [[str(reply), float(created)] for reply, created in replies]
+            except (TypeError, ValueError):
+                continue
+            replies = [item for item in replies if not self._expired(item[1], now)][-self.variants :]
+            if replies:
+                self._entries[str(key)] = {"replies": replies, "last": None}
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_s > 0 and now - created_at > self.ttl_s
+
+    def _debug(self, message: str) -> None:
+        if self.debug_cb:
+            self.debug_cb(message)
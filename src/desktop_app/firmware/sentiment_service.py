@@ -0,0 +1,151 @@
+import queue
+import threading
+from collections import OrderedDict
+
+
+SENTIMENT_CACHE_SIZE = 256
+SENTIMENT_BATCH_SIZE = 8
+# Neutral-ish default used while no sentiment model is available (matches the old not-ready score).
+SENTIMENT_UNAVAILABLE = 2
+SENTIMENT_ERROR = 3
+
+
+def normalize_sentiment_text(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def _stars(result) -> int:
+    label = result.get("label", "3 stars") if isinstance(result, dict) else "3 stars"
+    digits = "".join(ch for ch in label if ch.isdigit())
+    return int(digits) if digits else SENTIMENT_ERROR
+
+
+class SentimentService:
+    """Scores sentiment (1-5 stars) in batches on its own worker, with an LRU cache on normalized text."""
+
+    def __init__(self, debug_cb=None) -> None:
+        self.pipeline = None
+        self.debug_cb = debug_cb
+        self.hits = 0
+        self.misses = 0
+        # Separate from the generation lock so scoring overlaps with the next reply.
+        self.lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._requests = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def set_pipeline(self, pipeline) -> None:
+        self.pipeline = pipeline
+        with self._cache_lock:
+            self._cache.clear()
+
+    def submit(self, text: str, callback) -> None:
+        """Score in the background; callback(score) runs on the worker thread."""
+        cached = self._cached(text)
+        if cached is not None:
+            callback(cached)
+            return
+        if self.pipeline is None:
+            callback(SENTIMENT_UNAVAILABLE)
+            return
+        self._ensure_worker()
+        self._requests.put((text, callback))
+
+    def score(self, text: str, timeout: float | None = None) -> int:
+        done = threading.Event()
+        result = [SENTIMENT_ERROR]
+
+        def _store(score: int) -> None:
+            result[0] = score
+            done.set()
+
+        self.submit(text, _store)
+        done.wait(timeout)
+        return result[0]
+
+    def score_batch(self, texts: list[str]) -> list[int]:
+        if self.pipeline is None:
+            return [SENTIMENT_UNAVAILABLE for _ in texts]
+        scores = {}
+        pending = []
+        for text in texts:
+            key = normalize_sentiment_text(text)
+            cached = self._cached(text)
+            if cached is not None:
+                scores[key] = cached
+            elif key not in scores:
+                scores[key] = None
+                pending.append(text)
+        for text, score in zip(pending, self._run_pipeline(pending)):
+            scores[normalize_sentiment_text(text)] = score
+        return [scores[normalize_sentiment_text(text)] for text in texts]
+
+    def _cached(self, text: str) -> int | None:
+        key = normalize_sentiment_text(text)
+        with self._cache_lock:
+            score = self._cache.get(key)
+            if score is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return score
+
+    def _remember(self, text: str, score: int) -> None:
+        with self._cache_lock:
+            self._cache[normalize_sentiment_text(text)] = score
+            self._cache.move_to_end(normalize_sentiment_text(text))
+            while len(self._cache) > SENTIMENT_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def _run_pipeline(self, texts: list[str]) -> list[int]:
+        if not texts:
+            return []
+        pipeline = self.pipeline
+        if pipeline is None:
+            return [SENTIMENT_UNAVAILABLE for _ in texts]
+        try:
+            with self.lock:
+                try:
+                    # Let the tokenizer truncate to the model's window instead of cutting characters.
+                    results = pipeline(texts, truncation=True)
+                except TypeError:
+                    results = pipeline([text[:256] for text in texts])
+        except Exception as exc:
+            self._debug(f"TRACE:Sentiment batch faalde: {exc}")
+            return [SENTIMENT_ERROR for _ in texts]
+        if isinstance(results, dict):
+            results = [results]
+        scores = [_stars(result) for result in results]
+        for text, score in zip(texts, scores):
+            self._remember(text, score)
+        return scores
+
+    def _ensure_worker(self) -> None:
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._worker_loop, name="sentiment", daemon=True)
+            self._thread.start()
+
+    def _worker_loop(self) -> None:
+        while True:
+            batch = [self._requests.get()]
+            while len(batch) < SENTIMENT_BATCH_SIZE:
+                try:
+                    batch.append(self._requests.get_nowait())
+                except queue.Empty:
+                    break
+            unique = list(OrderedDict((normalize_sentiment_text(text), text) for text, _cb in batch).values())
+            scores = dict(zip((normalize_sentiment_text(text) for text in unique), self._run_pipeline(unique)))
+            for text, callback in batch:
+                try:
+                    callback(scores.get(normalize_sentiment_text(text), SENTIMENT_ERROR))
+                except Exception as exc:
+                    self._debug(f"TRACE:Sentiment callback faalde: {exc}")
+
+    def _debug(self, message: str) -> None:
+        if self.debug_cb:
+            self.debug_cb(message)
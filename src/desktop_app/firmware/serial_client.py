@@ -1,13 +1,234 @@
-﻿import serial
+﻿import queue
+import struct
+import threading
+from collections import deque
+from typing import NamedTuple
+
+import serial
 from serial.tools import list_ports
 
-from config import SERIAL_BAUD, SERIAL_TIMEOUT
+from config import SERIAL_BAUD, SERIAL_BINARY_PROTOCOL, SERIAL_RX_QUEUE_SIZE, SERIAL_TIMEOUT
+
+
+class SerialFrame(NamedTuple):
+    kind: str
+    fields: list
+    line: str
+
+
+def parse_frame(line: str) -> SerialFrame:
+    kind, sep, payload = line.partition(":")
+    if not sep:
+        return SerialFrame(line, [], line)
+    if kind == "ACK":
+        # ACK payloads are command names (e.g. SONAR:ON), not CSV values.
+        return SerialFrame(kind, [payload], line)
+    return SerialFrame(kind, payload.split(","), line)
+
+
+# Binary framing (negotiated via PROTO:BIN1 after HELLO/READY):
+# <0xA5> <opcode> <len> <payload...> <crc8 over opcode+len+payload, poly 0x07>
+FRAME_SYNC = 0xA5
+BINARY_PROTOCOL_TAG = "BIN1"
+
+OP_STOP = 0x01
+OP_RESET = 0x02
+OP_PING = 0x03
+OP_SONAR = 0x04
+OP_MOVE = 0x10
+OP_PAN_MODE = 0x11
+OP_PAN = 0x12
+OP_LCD = 0x13
+OP_BROW = 0x14
+OP_BROWMAP = 0x15
+OP_RGB = 0x16
+OP_BUZZER = 0x17
+OP_EMO = 0x18
+OP_MATRIX = 0x19
+
+
+def _build_crc8_table() -> bytes:
+    table = bytearray(256)
+    for value in range(256):
+        crc = value
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table[value] = crc
+    return bytes(table)
+
+
+_CRC8_TABLE = _build_crc8_table()
+
+
+def crc8(data: bytes) -> int:
+    crc = 0
+    for byte in data:
+        crc = _CRC8_TABLE[crc ^ byte]
+    return crc
+
+
+def build_frame(opcode: int, payload: bytes = b"") -> bytes:
+    body = bytes((opcode, len(payload))) + payload
+    return bytes((FRAME_SYNC,)) + body + bytes((crc8(body),))
+
+
+def _byte_values(csv: str, count: int, low: int = 0, high: int = 255) -> bytes:
+    values = [max(low, min(high, int(part))) for part in csv.split(",")[:count]]
+    if len(values) != count:
+        raise ValueError(csv)
+    return bytes(values)
+
+
+def encode_binary_command(line: str) -> bytes | None:
+    """Binary frame for an ASCII command, or None when it should go out as text."""
+    try:
+        if line == "STOP":
+            return build_frame(OP_STOP)
+        if line == "RESET":
+            return build_frame(OP_RESET)
+        if line == "PING":
+            return build_frame(OP_PING)
+        if line in ("SONAR:ON", "SONAR:OFF"):
+            return build_frame(OP_SONAR, bytes((1 if line == "SONAR:ON" else 0,)))
+        if line in ("PAN:AUTO", "PAN:MANUAL"):
+            return build_frame(OP_PAN_MODE, bytes((1 if line == "PAN:AUTO" else 0,)))
+        if line == "BUZZER:OFF":
+            return build_frame(OP_BUZZER, struct.pack(">BH", 0, 0))
+        head, _, payload = line.partition(":")
+        if head == "MOVE":
+            left, right = (max(-255, min(255, int(part))) for part in payload.split(",")[:2])
+            return build_frame(OP_MOVE, struct.pack(">hh", left, right))
+        if head == "PAN":
+            return build_frame(OP_PAN, _byte_values(payload, 1, 0, 180))
+        if head == "LCD":
+            text = payload.encode("ascii", "ignore")[:128]
+            return build_frame(OP_LCD, text)
+        if head == "BROW":
+            return build_frame(OP_BROW, _byte_values(payload, 2))
+        if head == "BROWMAP":
+            return build_frame(OP_BROWMAP, _byte_values(payload, 3))
+        if head == "RGB":
+            return build_frame(OP_RGB, _byte_values(payload, 3))
+        if head == "BUZZER" and payload.startswith("ON"):
+            _, _, pitch = payload.partition(",")
+            # Pitch 0 tells the firmware to keep its current pitch (plain BUZZER:ON).
+            pitch_hz = max(0, min(0xFFFF, int(pitch))) if pitch else 0
+            return build_frame(OP_BUZZER, struct.pack(">BH", 1, pitch_hz))
+        if head == "EMO":
+            values = [max(0, min(100, int(part))) for part in payload.split(",")[:8] if part]
+            values += [0] * (8 - len(values))
+            return build_frame(OP_EMO, bytes(values))
+        if head == "MATRIX":
+            return build_frame(OP_MATRIX, _byte_values(payload, 9))
+    except (TypeError, ValueError, struct.error):
+        return None
+    return None
+
+
+TX_PRIORITY_URGENT = 0
+TX_PRIORITY_MOTION = 1
+TX_PRIORITY_NORMAL = 2
+
+
+def command_priority(line: str) -> int:
+    if line in ("STOP", "RESET"):
+        return TX_PRIORITY_URGENT
+    if line.startswith(("MOVE:", "PAN:", "SONAR:")):
+        return TX_PRIORITY_MOTION
+    return TX_PRIORITY_NORMAL
+
+
+def coalesce_key(line: str) -> str | None:
+    if line.startswith("MOVE:"):
+        return "MOVE"
+    if line.startswith("LCD:"):
+        return "LCD"
+    if line.startswith("PAN:") and line[4:] not in ("AUTO", "MANUAL"):
+        return "PAN"
+    if line.startswith("MATRIX:"):
+        # Only the newest bitmap per segment matters; stale animation frames are replaced.
+        return f"MATRIX:{line[7:].split(',', 1)[0]}"
+    return None
+
+
+class OutboundQueue:
+    """Prioritized TX queue where a newer MOVE/PAN/LCD/MATRIX replaces the pending one in place."""
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._lanes = [deque(), deque(), deque()]
+        self._pending = {}
+        self.coalesced = 0
+
+    def put(self, line: str) -> None:
+        key = coalesce_key(line)
+        with self._cond:
+            if line == "RESET":
+                # The robot drops all state on RESET, so anything still queued is moot.
+                self._clear_locked()
+            elif line == "STOP":
+                self._cancel_locked("MOVE")
+            if key is not None:
+                entry = self._pending.get(key)
+                if entry is not None:
+                    entry[1] = line
+                    self.coalesced += 1
+                    return
+            entry = [key, line]
+            if key is not None:
+                self._pending[key] = entry
+            self._lanes[command_priority(line)].append(entry)
+            self._cond.notify()
+
+    def get(self, timeout: float) -> str | None:
+        with self._cond:
+            while True:
+                for lane in self._lanes:
+                    while lane:
+                        entry = lane.popleft()
+                        key, line = entry
+                        if key is not None and self._pending.get(key) is entry:
+                            del self._pending[key]
+                        if line is not None:
+                            return line
+                if not self._cond.wait(timeout):
+                    return None
+
+    def empty(self) -> bool:
+        with self._cond:
+            return not any(self._lanes)
+
+    def clear(self) -> None:
+        with self._cond:
+            self._clear_locked()
+
+    def wake(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
+
+    def _cancel_locked(self, key: str) -> None:
+        entry = self._pending.pop(key, None)
+        if entry is not None:
+            entry[1] = None
+
+    def _clear_locked(self) -> None:
+        for lane in self._lanes:
+            lane.clear()
+        self._pending.clear()
 
 
 class SerialManager:
     def __init__(self, debug_cb=None) -> None:
         self.serial_port = None
         self.debug_cb = debug_cb
+        self.rx_frames = queue.Queue(maxsize=max(16, SERIAL_RX_QUEUE_SIZE))
+        self.rx_dropped = 0
+        self.tx_queue = OutboundQueue()
+        self.link_error = None
+        self.binary_mode = False
+        self._reader_thread = None
+        self._writer_thread = None
+        self._io_stop = threading.Event()
 
     def refresh_ports(self) -> list:
         ports = [port.device for port in list_ports.comports()]
@@ -16,12 +237,14 @@ class SerialManager:
     def connect(self, port: str) -> tuple:
         try:
             self.serial_port = serial.Serial(port=port, baudrate=SERIAL_BAUD, timeout=SERIAL_TIMEOUT)
-            return True, ""
         except serial.SerialException as exc:
             self.serial_port = None
             return False, str(exc)
+        self._start_io_threads()
+        return True, ""
 
-    def disconnect(self) -> None:
+    def disconnect(self, flush_timeout: float = 0.5) -> None:
+        self._stop_io_threads(flush_timeout)
         if self.serial_port:
             try:
                 self.serial_port.close()
@@ -30,16 +253,137 @@ class SerialManager:
 
     def safe_stop(self) -> None:
         if self.serial_port and self.serial_port.is_open:
-            try:
-                self.send_line("STOP")
-            except serial.SerialException:
-                pass
+            self.send_line("STOP")
         self.disconnect()
 
     def send_line(self, line: str) -> None:
         if not self.serial_port or not self.serial_port.is_open:
             return
-        payload = (line + "\n").encode("utf-8")
-        self.serial_port.write(payload)
+        self.tx_queue.put(line)
         if self.debug_cb:
             self.debug_cb(line)
+
+    def encoded_size(self, line: str) -> int:
+        if self.binary_mode:
+            frame = encode_binary_command(line)
+            if frame is not None:
+                return len(frame)
+        return len((line + "\n").encode("utf-8"))
+
+    def poll_frames(self, max_frames: int = 64) -> list:
+        """Drain up to max_frames parsed frames; raises if an I/O thread died."""
+        frames = []
+        while len(frames) < max_frames:
+            try:
+                frames.append(self.rx_frames.get_nowait())
+            except queue.Empty:
+                break
+        if not frames and self.link_error is not None:
+            error = self.link_error
+            self.link_error = None
+            raise error
+        return frames
+
+    def has_pending_frames(self) -> bool:
+        return not self.rx_frames.empty()
+
+    def _start_io_threads(self) -> None:
+        self._stop_io_threads(0.0)
+        self.link_error = None
+        self.binary_mode = False
+        self.rx_dropped = 0
+        self.tx_queue.clear()
+        while not self.rx_frames.empty():
+            try:
+                self.rx_frames.get_nowait()
+            except queue.Empty:
+                break
+        self._io_stop = threading.Event()
+        self._reader_thread = threading.Thread(
+            target=self._reader_loop,
+            args=(self.serial_port, self._io_stop),
+            name="serial-reader",
+            daemon=True,
+        )
+        self._writer_thread = threading.Thread(
+            target=self._writer_loop,
+            args=(self.serial_port, self._io_stop),
+            name="serial-writer",
+            daemon=True,
+        )
+        self._reader_thread.start()
+        self._writer_thread.start()
+
+    def _stop_io_threads(self, flush_timeout: float) -> None:
+        self._io_stop.set()
+        self.tx_queue.wake()
+        writer = self._writer_thread
+        reader = self._reader_thread
+        self._writer_thread = None
+        self._reader_thread = None
+        if writer is not None:
+            # The writer drains what is queued (e.g. the final STOP) before it exits.
+            writer.join(timeout=max(0.0, flush_timeout))
+        self.tx_queue.clear()
+        if reader is not None and reader is not threading.current_thread():
+            # Reads time out after SERIAL_TIMEOUT, so the loop notices the stop flag quickly.
+            reader.join(timeout=max(0.5, SERIAL_TIMEOUT * 4))
+
+    def _writer_loop(self, port, stop_event: threading.Event) -> None:
+        while True:
+            line = self.tx_queue.get(timeout=0.1)
+            if line is None:
+                if stop_event.is_set():
+                    return
+                continue
+            payload = encode_binary_command(line) if self.binary_mode else None
+            if payload is None:
+                payload = (line + "\n").encode("utf-8")
+            try:
+                port.write(payload)
+            except Exception as exc:
+                if not stop_event.is_set():
+                    self.link_error = serial.SerialException(str(exc))
+                return
+
+    def _reader_loop(self, port, stop_event: threading.Event) -> None:
+        buffer = bytearray()
+        while not stop_event.is_set():
+            try:
+                chunk = port.read(port.in_waiting or 1)
+            except Exception as exc:
+                if not stop_event.is_set():
+                    self.link_error = serial.SerialException(str(exc))
+                return
+            if not chunk:
+                continue
+            buffer.extend(chunk)
+            while True:
+                end = buffer.find(b"\n")
+                if end < 0:
+                    break
+                raw = bytes(buffer[:end])
+                del buffer[: end + 1]
+                line = raw.decode("utf-8", errors="ignore").strip()
+                if line:
+                    frame = parse_frame(line)
+                    if frame.kind == "PROTO":
+                        # Firmware advertises binary support right after READY.
+                        self.binary_mode = SERIAL_BINARY_PROTOCOL and BINARY_PROTOCOL_TAG in frame.fields
+                    self._push_frame(frame)
+            if len(buffer) > 4096:
+                # No newline in 4 KB means line noise; resync on the next newline.
+                buffer.clear()
+
+    def _push_frame(self, frame: SerialFrame) -> None:
+        while True:
+            try:
+                self.rx_frames.put_nowait(frame)
+                return
+            except queue.Full:
+                # Telemetry is periodic: dropping the oldest frame loses nothing the next burst won't repeat.
+                try:
+                    self.rx_frames.get_nowait()
+                    self.rx_dropped += 1
+                except queue.Empty:
+                    pass
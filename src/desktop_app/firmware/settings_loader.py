@@ -19,3 +19,4 @@ def _load_settings_module():
 _SETTINGS = _load_settings_module()
 load_settings = _SETTINGS.load_settings
 save_settings = _SETTINGS.save_settings
+settings_store = _SETTINGS.settings_store
@@ -0,0 +1,44 @@
+import copy
+import traceback
+
+
+class SettingsWatcher:
+    """Calls handler(new, old) for each watched settings subtree that changed since the last poll.
+
+    Cheap to poll: the store only re-reads settings.json when its mtime/size changed, and handlers
+    run only for subtrees whose value actually differs.
+    """
+
+    def __init__(self, store, handlers: dict, debug_cb=None) -> None:
+        self.store = store
+        self.handlers = dict(handlers)
+        self.debug_cb = debug_cb
+        self.reloads = 0
+        self._generation = store.generation
+        self._seen = {path: copy.deepcopy(store.get(path)) for path in self.handlers}
+
+    def poll(self) -> list[str]:
+        self.store.refresh()
+        if self.store.generation == self._generation:
+            return []
+        self._generation = self.store.generation
+        changed = []
+        for path, handler in self.handlers.items():
+            value = self.store.get(path)
+            previous = self._seen.get(path)
+            if value == previous:
+                continue
+            self._seen[path] = copy.deepcopy(value)
+            try:
+                handler(value, previous)
+            except Exception:
+                self._debug(f"TRACE:{traceback.format_exc()}")
+                continue
+            changed.append(path)
+        if changed:
+            self.reloads += 1
+        return changed
+
+    def _debug(self, message: str) -> None:
+        if self.debug_cb:
+            self.debug_cb(message)
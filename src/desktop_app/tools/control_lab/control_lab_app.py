@@ -11,11 +11,18 @@ FIRMWARE_ROOT = Path(__file__).resolve().parents[2] / "firmware"
 if str(FIRMWARE_ROOT) not in sys.path:
     sys.path.insert(0, str(FIRMWARE_ROOT))
 
-from config import CONTROL_LAB_DEFAULTS, EMOTION_BUZZER_ENABLED, EMOTIONS, PAN_AUTO_SPEED_MS
+from config import (
+    CONTROL_LAB_DEFAULTS,
+    EMOTION_BUZZER_ENABLED,
+    EMOTIONS,
+    PAN_AUTO_SPEED_MS,
+    SERIAL_POLL_INTERVAL_MS,
+    SERIAL_RX_BATCH_SIZE,
+)
 from emotion_output_store import load_emotion_buzzer_pitch_map, load_emotion_rgb_map
 from eyebrow_store import browmap_command_for_emotion, load_eyebrow_angles
 from led_matrix_store import load_led_matrix_patterns, matrix_commands_for_emotion
-from serial_client import SerialManager
+from serial_client import SerialFrame, SerialManager
 
 
 class ControlLabApp:
@@ -726,29 +733,26 @@ class ControlLabApp:
         if not self.connected or not self.serial.serial_port:
             return
         try:
-            while self.serial.serial_port.in_waiting:
-                raw = self.serial.serial_port.readline()
-                if not raw:
-                    break
-                line = raw.decode("utf-8", errors="ignore").strip()
-                if line:
-                    self._on_rx(line)
+            frames = self.serial.poll_frames(SERIAL_RX_BATCH_SIZE)
         except serial.SerialException as exc:
             self._append_log(f"[ERR] {exc}")
             self._disconnect()
             return
-        self.poll_after_id = self.root.after(100, self._poll_serial)
+        for frame in frames:
+            self._on_rx(frame)
+        delay = 1 if self.serial.has_pending_frames() else SERIAL_POLL_INTERVAL_MS
+        self.poll_after_id = self.root.after(delay, self._poll_serial)
 
     def _on_tx(self, line: str) -> None:
         self._append_log(f"[TX] {line}")
 
-    def _on_rx(self, line: str) -> None:
-        self._append_log(f"[RX] {line}")
-        if line.startswith("ACK:"):
-            self._set_t("Laatste Commando", line[4:])
+    def _on_rx(self, frame: SerialFrame) -> None:
+        self._append_log(f"[RX] {frame.line}")
+        p = frame.fields
+        if frame.kind == "ACK":
+            self._set_t("Laatste Commando", p[0])
             return
-        if line.startswith("STAT:"):
-            p = line[5:].split(",")
+        if frame.kind == "STAT":
             if len(p) >= 5:
                 self._set_t("Sonar Links", f"{self._safe_int(p[0])} cm")
                 self._set_t("Sonar Rechts", f"{self._safe_int(p[1])} cm")
@@ -756,22 +760,19 @@ class ControlLabApp:
                 self._set_t("Batterij", f"{self._safe_int(p[3])}%")
                 self._set_t("Navigatie Modus", p[4])
             return
-        if line.startswith("OUT:"):
-            p = line[4:].split(",")
+        if frame.kind == "OUT":
             if len(p) >= 6:
                 self._set_t("RGB Status", f"{p[0]},{p[1]},{p[2]}")
                 self._set_t("Buzzer", "Aan" if p[3] == "1" else "Uit")
                 self._set_t("Matrix", p[4])
                 self._set_t("LCD", ",".join(p[5:]).strip())
             return
-        if line.startswith("BROW:"):
-            p = line[5:].split(",")
+        if frame.kind == "BROW":
             if len(p) >= 2:
                 self._set_t("Eyebrow Links", f"{self._safe_int(p[0])} deg")
                 self._set_t("Eyebrow Rechts", f"{self._safe_int(p[1])} deg")
             return
-        if line.startswith("ACT:"):
-            p = line[4:].split(",")
+        if frame.kind == "ACT":
             if len(p) >= 4:
                 self._set_t("Pan Mode", p[0])
                 self._set_t("Pan Angle", f"{self._safe_int(p[1])} deg")
@@ -845,7 +846,7 @@ class ControlLabApp:
                 pass
             self.poll_after_id = None
         try:
-            self.serial.disconnect()
+            self.serial.disconnect(flush_timeout=0.0)
         except Exception:
             pass
         self.connected = False
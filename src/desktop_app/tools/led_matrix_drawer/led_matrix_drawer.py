@@ -9,17 +9,18 @@ if str(FIRMWARE_ROOT) not in sys.path:
     sys.path.insert(0, str(FIRMWARE_ROOT))
 
 from config import EMOTIONS
+from led_matrix_frame import MatrixFrame
 from led_matrix_store import (
     MATRIX_COLS,
     MATRIX_ROWS,
     blank_patterns_for_emotions,
-    grid_to_segments,
+    invalidate_matrix_command_cache,
     load_led_matrix_patterns,
     matrix_commands_for_emotion,
     save_led_matrix_patterns,
-    segments_to_grid,
 )
 from serial_client import SerialManager
+from settings_loader import settings_store
 
 
 class LedMatrixDrawerApp:
@@ -40,7 +41,8 @@ class LedMatrixDrawerApp:
 
         self.cell = 24
         self.pad = 2
-        self.grid = [[0 for _ in range(MATRIX_COLS)] for _ in range(MATRIX_ROWS)]
+        self.frame = MatrixFrame()
+        self.drawn_frame = MatrixFrame()
         self.rectangles = [[None for _ in range(MATRIX_COLS)] for _ in range(MATRIX_ROWS)]
 
         self._build_style()
@@ -163,19 +165,20 @@ class LedMatrixDrawerApp:
         segments = self.patterns.get(emotion)
         if segments is None:
             return
-        self.grid = segments_to_grid(segments)
+        self.frame = MatrixFrame.from_segments(segments)
         self._redraw_grid()
 
     def _redraw_grid(self) -> None:
-        for y in range(MATRIX_ROWS):
-            for x in range(MATRIX_COLS):
-                color = "#00C853" if self.grid[y][x] else "#3A3A3A"
-                self.canvas.itemconfigure(self.rectangles[y][x], fill=color)
+        # Only touch canvas items whose pixel differs from what is on screen.
+        for x, y in self.frame.changed_pixels(self.drawn_frame):
+            color = "#00C853" if self.frame.get(x, y) else "#3A3A3A"
+            self.canvas.itemconfigure(self.rectangles[y][x], fill=color)
+        self.drawn_frame = self.frame
 
     def _toggle_pixel(self, y: int, x: int) -> None:
         if not self.drawing_enabled.get():
             return
-        self.grid[y][x] = 0 if self.grid[y][x] else 1
+        self.frame = self.frame.toggled(x, y)
         self._redraw_grid()
 
     def _on_emotion_change(self, _event=None) -> None:
@@ -184,12 +187,12 @@ class LedMatrixDrawerApp:
 
     def _save_current(self) -> None:
         emotion = self.current_emotion.get()
-        self.patterns[emotion] = grid_to_segments(self.grid)
+        self.patterns[emotion] = self.frame.segments()
         save_led_matrix_patterns(self.patterns, EMOTIONS)
         self.info_var.set(f"Saved {emotion} pattern to settings.json")
 
     def _clear_current(self) -> None:
-        self.grid = [[0 for _ in range(MATRIX_COLS)] for _ in range(MATRIX_ROWS)]
+        self.frame = MatrixFrame()
         self._redraw_grid()
         self.info_var.set(f"Cleared current canvas for {self.current_emotion.get()}.")
 
@@ -204,7 +207,9 @@ class LedMatrixDrawerApp:
             self.info_var.set("Connect first to send MATRIX commands.")
             return
         emotion = self.current_emotion.get()
-        self.patterns[emotion] = grid_to_segments(self.grid)
+        self.patterns[emotion] = self.frame.segments()
+        # The unsaved canvas replaces the pattern, so the cached frame for this emotion is stale.
+        invalidate_matrix_command_cache()
         for cmd in matrix_commands_for_emotion(emotion, self.patterns):
             self.serial.send_line(cmd)
         self.info_var.set(f"Sent MATRIX payload for {emotion}.")
@@ -248,6 +253,8 @@ class LedMatrixDrawerApp:
         pass
 
     def on_close(self) -> None:
+        # Pattern saves are debounced; write what is still pending before the window goes away.
+        settings_store().flush()
         self._disconnect()
         self.root.destroy()
 
@@ -51,8 +51,17 @@ static inline void compatSetRGBLed(int r, int g, int b) {
 // - BROWMAP:<emotionIndex>,<left>,<right>  emotionIndex=0..7, angles 45..135
 // - MATRIX:<segment>,<row0>..<row7>      segment=0..3, each row byte 0..255
 //
+// Binaire frames (optioneel, zelfde commando's, na PROTO:BIN1)
+// - <0xA5> <opcode> <len> <payload...> <crc8>   crc8 (poly 0x07) over opcode+len+payload
+// - opcodes: 0x01 STOP, 0x02 RESET, 0x03 PING, 0x04 SONAR [on],
+//            0x10 MOVE [int16 left, int16 right], 0x11 PAN mode [auto], 0x12 PAN [angle],
+//            0x13 LCD [tekst], 0x14 BROW [l,r], 0x15 BROWMAP [idx,l,r], 0x16 RGB [r,g,b],
+//            0x17 BUZZER [on, uint16 pitch (0 = huidige)], 0x18 EMO [8 bytes], 0x19 MATRIX [seg, 8 rows]
+// - ASCII regels blijven altijd werken (0xA5 komt nooit voor in ASCII).
+//
 // Robot -> PC
 // - READY
+// - PROTO:BIN1                          na READY: binaire frames worden ondersteund
 // - PONG
 // - ACK:<command>
 // - ACK:RESET
@@ -61,6 +70,7 @@ static inline void compatSetRGBLed(int r, int g, int b) {
 // - ACT:<panMode>,<panAngle>,<buzzerOn>,<buzzerPitch>
 // - BROW:<leftAngle>,<rightAngle>
 // - EMO:<h>,<fat>,<hun>,<sad>,<anx>,<aff>,<cur>,<fru>
+// - ERR:CRC                             binaire frame met foute checksum genegeerd
 
 // Keep these in sync with src/settings/settings.json (robot.pins / robot.* defaults).
 // RGB LED is fixed by Dwenguino hardware: R=11, G=14, B=15.
@@ -111,6 +121,36 @@ const int LCD_TEXT_MAX = 128;
 char inputBuffer[INPUT_BUFFER_SIZE];
 int inputPos = 0;
 
+#define FRAME_SYNC 0xA5
+#define FRAME_MAX_PAYLOAD 130
+// Maximum silence between two bytes of one frame; a whole 128-byte LCD frame takes ~137 ms at 9600 baud.
+#define FRAME_BYTE_TIMEOUT_MS 50
+#define OP_STOP 0x01
+#define OP_RESET 0x02
+#define OP_PING 0x03
+#define OP_SONAR 0x04
+#define OP_MOVE 0x10
+#define OP_PAN_MODE 0x11
+#define OP_PAN 0x12
+#define OP_LCD 0x13
+#define OP_BROW 0x14
+#define OP_BROWMAP 0x15
+#define OP_RGB 0x16
+#define OP_BUZZER 0x17
+#define OP_EMO 0x18
+#define OP_MATRIX 0x19
+
+enum FrameState { FRAME_IDLE, FRAME_OPCODE, FRAME_LENGTH, FRAME_PAYLOAD, FRAME_CRC };
+FrameState frameState = FRAME_IDLE;
+byte frameOpcode = 0;
+byte frameLength = 0;
+byte framePos = 0;
+byte frameCrc = 0;
+unsigned long frameLastByteMs = 0;
+// After an aborted frame the rest of its payload is noise: skip everything up to the next sync byte.
+bool frameResync = false;
+byte framePayload[FRAME_MAX_PAYLOAD + 1];
+
 int cmdLeft = 0;
 int cmdRight = 0;
 bool cmdActive = false;
@@ -161,6 +201,14 @@ Servo servo3;  // pin 19: 180° servo
 Servo servo4;  // pin 18: eyebrow left
 Servo servo5;  // pin 17: eyebrow right
 
+byte crc8Update(byte crc, byte data) {
+  crc ^= data;
+  for (int bit = 0; bit < 8; bit++) {
+    crc = (crc & 0x80) ? (byte)((crc << 1) ^ 0x07) : (byte)(crc << 1);
+  }
+  return crc;
+}
+
 void setEyebrowAngles(int leftAngle, int rightAngle) {
   eyebrowLeftAngle = constrain(leftAngle, 45, 135);
   eyebrowRightAngle = constrain(rightAngle, 45, 135);
@@ -534,6 +582,30 @@ void applyEmotionOutputs() {
   setEyebrowAngles(emotionEyebrowAngles[maxIndex][0], emotionEyebrowAngles[maxIndex][1]);
 }
 
+void applyStopCommand() {
+  cmdActive = false;
+  stopLatch = true;
+  stopRobot();
+  currentNavMode = "STOP";
+}
+
+void applyMoveCommand(int leftVal, int rightVal) {
+  cmdLeft = constrain(leftVal, -255, 255);
+  cmdRight = constrain(rightVal, -255, 255);
+  cmdActive = true;
+  stopLatch = false;
+  lastCmdMs = millis();
+}
+
+bool setEmotionEyebrowMap(int emoIndex, int leftAngle, int rightAngle) {
+  if (emoIndex < 0 || emoIndex >= EMO_COUNT) {
+    return false;
+  }
+  emotionEyebrowAngles[emoIndex][0] = constrain(leftAngle, 45, 135);
+  emotionEyebrowAngles[emoIndex][1] = constrain(rightAngle, 45, 135);
+  return true;
+}
+
 void sendTelemetry() {
   refreshSonarSnapshot();
 
@@ -593,6 +665,7 @@ void handleLine(String line) {
   }
   if (line == "HELLO") {
     Serial.println(F("READY"));
+    Serial.println(F("PROTO:BIN1"));
     return;
   }
   if (line == "PING") {
@@ -600,10 +673,7 @@ void handleLine(String line) {
     return;
   }
   if (line == "STOP") {
-    cmdActive = false;
-    stopLatch = true;
-    stopRobot();
-    currentNavMode = "STOP";
+    applyStopCommand();
     Serial.println(F("ACK:STOP"));
     return;
   }
@@ -627,11 +697,7 @@ void handleLine(String line) {
     if (commaIndex > 0) {
       int leftVal = line.substring(5, commaIndex).toInt();
       int rightVal = line.substring(commaIndex + 1).toInt();
-      cmdLeft = constrain(leftVal, -255, 255);
-      cmdRight = constrain(rightVal, -255, 255);
-      cmdActive = true;
-      stopLatch = false;
-      lastCmdMs = millis();
+      applyMoveCommand(leftVal, rightVal);
       Serial.println(F("ACK:MOVE"));
     }
     return;
@@ -676,9 +742,7 @@ void handleLine(String line) {
       int emoIndex = payload.substring(0, first).toInt();
       int leftAngle = payload.substring(first + 1, second).toInt();
       int rightAngle = payload.substring(second + 1).toInt();
-      if (emoIndex >= 0 && emoIndex < EMO_COUNT) {
-        emotionEyebrowAngles[emoIndex][0] = constrain(leftAngle, 45, 135);
-        emotionEyebrowAngles[emoIndex][1] = constrain(rightAngle, 45, 135);
+      if (setEmotionEyebrowMap(emoIndex, leftAngle, rightAngle)) {
         Serial.println(F("ACK:BROWMAP"));
       }
     }
@@ -763,9 +827,176 @@ void handleLine(String line) {
   }
 }
 
+void handleFrame(byte opcode, const byte *payload, byte length) {
+  switch (opcode) {
+    case OP_STOP:
+      applyStopCommand();
+      Serial.println(F("ACK:STOP"));
+      return;
+    case OP_RESET:
+      softResetState();
+      Serial.println(F("ACK:RESET"));
+      return;
+    case OP_PING:
+      Serial.println(F("PONG"));
+      return;
+    case OP_SONAR:
+      if (length >= 1) {
+        setSonarEnabled(payload[0] != 0);
+        Serial.println(payload[0] ? F("ACK:SONAR:ON") : F("ACK:SONAR:OFF"));
+      }
+      return;
+    case OP_MOVE:
+      if (length >= 4) {
+        int leftVal = (int16_t)((payload[0] << 8) | payload[1]);
+        int rightVal = (int16_t)((payload[2] << 8) | payload[3]);
+        applyMoveCommand(leftVal, rightVal);
+        Serial.println(F("ACK:MOVE"));
+      }
+      return;
+    case OP_PAN_MODE:
+      if (length >= 1) {
+        setPanAutoMode(payload[0] != 0);
+        Serial.println(payload[0] ? F("ACK:PAN:AUTO") : F("ACK:PAN:MANUAL"));
+      }
+      return;
+    case OP_PAN:
+      if (length >= 1) {
+        setPanManualAngle(payload[0]);
+        Serial.println(F("ACK:PAN"));
+      }
+      return;
+    case OP_LCD: {
+      char text[FRAME_MAX_PAYLOAD + 1];
+      byte count = min(length, (byte)LCD_TEXT_MAX);
+      memcpy(text, payload, count);
+      text[count] = '\0';
+      updateLCD(String(text));
+      Serial.println(F("ACK:LCD"));
+      return;
+    }
+    case OP_BROW:
+      if (length >= 2) {
+        setEyebrowAngles(payload[0], payload[1]);
+        Serial.println(F("ACK:BROW"));
+      }
+      return;
+    case OP_BROWMAP:
+      if (length >= 3 && setEmotionEyebrowMap(payload[0], payload[1], payload[2])) {
+        Serial.println(F("ACK:BROWMAP"));
+      }
+      return;
+    case OP_RGB:
+      if (length >= 3) {
+        setRgbOutput(payload[0], payload[1], payload[2]);
+        Serial.println(F("ACK:RGB"));
+      }
+      return;
+    case OP_BUZZER:
+      if (length >= 3) {
+        unsigned int pitch = ((unsigned int)payload[1] << 8) | payload[2];
+        if (payload[0]) {
+          setBuzzerOutput(true, pitch > 0 ? (int)pitch : currentBuzzerPitch);
+          Serial.println(F("ACK:BUZZER:ON"));
+        } else {
+          setBuzzerOutput(false, currentBuzzerPitch);
+          Serial.println(F("ACK:BUZZER:OFF"));
+        }
+      }
+      return;
+    case OP_EMO:
+      for (int i = 0; i < EMO_COUNT; i++) {
+        currentEmo[i] = (i < length) ? constrain(payload[i], 0, 100) : 0;
+      }
+      applyEmotionOutputs();
+      Serial.println(F("ACK:EMO"));
+      return;
+    case OP_MATRIX:
+      if (length >= 9 && payload[0] < LED_MATRIX_SEGMENT_COUNT) {
+        for (int row = 0; row < 8; row++) {
+          currentMatrixFrame[payload[0]][row] = payload[row + 1];
+        }
+        setMatrixPattern(payload[0], currentMatrixFrame[payload[0]]);
+        Serial.println(F("ACK:MATRIX"));
+      }
+      return;
+    default:
+      return;
+  }
+}
+
+void readFrameByte(byte incoming) {
+  switch (frameState) {
+    case FRAME_OPCODE:
+      frameOpcode = incoming;
+      frameCrc = crc8Update(0, incoming);
+      frameState = FRAME_LENGTH;
+      return;
+    case FRAME_LENGTH:
+      frameLength = incoming;
+      frameCrc = crc8Update(frameCrc, incoming);
+      framePos = 0;
+      if (frameLength > FRAME_MAX_PAYLOAD) {
+        frameState = FRAME_IDLE;
+        frameResync = true;
+      } else {
+        frameState = (frameLength == 0) ? FRAME_CRC : FRAME_PAYLOAD;
+      }
+      return;
+    case FRAME_PAYLOAD:
+      framePayload[framePos++] = incoming;
+      frameCrc = crc8Update(frameCrc, incoming);
+      if (framePos >= frameLength) {
+        frameState = FRAME_CRC;
+      }
+      return;
+    case FRAME_CRC:
+      frameState = FRAME_IDLE;
+      if (incoming == frameCrc) {
+        handleFrame(frameOpcode, framePayload, frameLength);
+      } else {
+        Serial.println(F("ERR:CRC"));
+      }
+      return;
+    default:
+      frameState = FRAME_IDLE;
+      return;
+  }
+}
+
 void readSerial() {
+  if (frameState != FRAME_IDLE && millis() - frameLastByteMs > FRAME_BYTE_TIMEOUT_MS) {
+    // Drop a half-received frame so a lost byte can't swallow the next commands.
+    frameState = FRAME_IDLE;
+    frameResync = true;
+    inputPos = 0;
+  }
   while (Serial.available() > 0) {
-    char incoming = (char)Serial.read();
+    byte raw = (byte)Serial.read();
+    if (frameState != FRAME_IDLE) {
+      frameLastByteMs = millis();
+      readFrameByte(raw);
+      continue;
+    }
+    if (frameResync) {
+      // A sync byte or a line end marks a clean boundary; ASCII commands resume after the newline.
+      if (raw == '\n' || raw == '\r') {
+        frameResync = false;
+        inputPos = 0;
+        continue;
+      }
+      if (raw != FRAME_SYNC) {
+        continue;
+      }
+      frameResync = false;
+      inputPos = 0;
+    }
+    if (raw == FRAME_SYNC && inputPos == 0) {
+      frameState = FRAME_OPCODE;
+      frameLastByteMs = millis();
+      continue;
+    }
+    char incoming = (char)raw;
     if (incoming == '\n' || incoming == '\r') {
       if (inputPos > 0) {
         inputBuffer[inputPos] = '\0';
@@ -1,10 +1,19 @@
+import atexit
 import copy
 import json
+import os
+import threading
+import time
 from pathlib import Path
 from typing import Any
 
 
 SETTINGS_PATH = Path(__file__).with_name("settings.json")
+# Debounced writes: wait this long after the last update, but never longer than the max delay.
+SAVE_DEBOUNCE_S = 0.5
+SAVE_MAX_DELAY_S = 3.0
+# Subtrees down to this depth ("desktop_app.led_matrix") are serialized and cached separately.
+_FRAGMENT_DEPTH = 2
 
 
 def _merge_dict(base: dict, override: dict) -> dict:
@@ -33,8 +42,13 @@ def default_settings() -> dict:
             "serial": {
                 "baud": 9600,
                 "timeout": 0.1,
+                "rx_queue_size": 512,
+                "rx_batch_size": 64,
+                "poll_interval_ms": 30,
+                "binary_protocol": True,
             },
             "pan_auto_speed_ms": 120,
+            "settings_watch_interval_ms": 1000,
             "emotion_buzzer_enabled": True,
             "emotion_buzzer_min_intensity": 35,
             "emotion_rgb_by_emotion": {
@@ -70,6 +84,86 @@ def default_settings() -> dict:
                 "repetition_penalty": 1.08,
                 "temperature": 0.7,
                 "top_p": 0.9,
+                "prefix_cache": True,
+                "history_token_budget": 384,
+                "load_profile": "auto",
+                "assisted_generation": False,
+                "assistant_model_name": "",
+                "queue_size": 4,
+                "request_timeout_s": 90.0,
+                "response_cache": True,
+                "response_cache_size": 512,
+                "response_cache_ttl_s": 604800,
+                "response_cache_variants": 3,
+                "response_cache_explore": 0.2,
+                "response_cache_path": "",
+                "backend": "process",
+                "backend_url": "http://127.0.0.1:8080/v1",
+                "backend_model": "",
+                "backend_api_key": "",
+                "backend_timeout_s": 60.0,
+                "onnx_model_dir": "",
+                "onnx_sentiment_dir": "",
+                "worker_backend": "transformers",
+                "worker_health_interval_s": 5.0,
+                "worker_ping_timeout_s": 20.0,
+            },
+            "intents": [
+                {"name": "time", "keywords": ["hoe laat", "tijd is het", "tijd?"], "action": "time"},
+                {
+                    "name": "name",
+                    "keywords": ["hoe heet je", "wie ben jij", "wie ben je", "wat is je naam"],
+                    "reply": "Ik ben NIER, een sociale robot. Leuk je te spreken!",
+                    "max_words": 8,
+                },
+                {
+                    "name": "thanks",
+                    "keywords": ["bedankt", "dankjewel", "dank je wel"],
+                    "reply": "Graag gedaan!",
+                    "max_words": 4,
+                },
+                {
+                    "name": "greeting",
+                    "keywords": ["hallo", "hey", "hoi", "goeiemorgen", "goedemorgen", "goedenavond"],
+                    "fallback": "Hey, ik ben er. Vertel, waar heb je nu zin in?",
+                },
+                {
+                    "name": "how_are_you",
+                    "keywords": ["hoe gaat", "gaat het", "alles goed"],
+                    "fallback": "Met mij gaat het goed. Met jou ook?",
+                },
+                {
+                    "name": "food",
+                    "keywords": ["honger", "eten", "snoep", "food"],
+                    "fallback": "Ik heb altijd zin in een snack. Wat staat er op het menu?",
+                },
+                {
+                    "name": "sleep",
+                    "keywords": ["moe", "slapen", "slaap"],
+                    "fallback": "Een powernap klinkt goed. Maar ik kan nog even door.",
+                },
+                {"name": "question", "keywords": ["?"], "prefixes": ["waarom", "hoe", "wat", "wanneer", "wie", "welke"]},
+                {"name": "emo_fatigue", "keywords": ["moe", "slaperig"], "emotion": "Fatigue", "level": 75, "stat_boost": 10},
+                {"name": "emo_hunger", "keywords": ["honger", "eten"], "emotion": "Hunger", "level": 70, "stat_boost": 10},
+                {"name": "emo_anxiety", "keywords": ["bang", "stress", "zenuw"], "emotion": "Anxiety", "level": 72},
+                {"name": "emo_affection", "keywords": ["lief", "dank", "vriend"], "emotion": "Affection", "level": 68},
+                {"name": "emo_curiosity", "keywords": ["nieuw", "wat", "hoe", "?"], "emotion": "Curiosity", "level": 60},
+                {"name": "emo_frustration", "keywords": ["boos", "frustr", "irrit"], "emotion": "Frustration", "level": 70},
+            ],
+            "emotion_model": {
+                "baseline": 10,
+                "half_life_s": 90.0,
+                "half_life_s_by_emotion": {"Happiness": 240.0, "Sadness": 240.0},
+                "drive_per_s": {"Hunger": 0.02, "Fatigue": 0.012},
+                "tick_hz": 8.0,
+                "emit_threshold": 3,
+                "emit_min_interval_s": 0.5,
+                "presence_cm": 40,
+                "presence_emotion": "Curiosity",
+                "presence_level": 55,
+                "low_battery_pct": 20,
+                "low_battery_emotion": "Fatigue",
+                "low_battery_level": 80,
             },
             "control_lab": {
                 "window_width": 1220,
@@ -98,7 +192,15 @@ def default_settings() -> dict:
                     "Affection": [[0, 0, 0, 0, 0, 0, 0, 0], [0, 66, 165, 153, 153, 165, 66, 60], [0, 0, 0, 0, 0, 0, 0, 0]],
                     "Curiosity": [[0, 0, 0, 0, 0, 0, 0, 0], [24, 36, 66, 165, 129, 66, 36, 24], [0, 0, 0, 0, 0, 0, 0, 0]],
                     "Frustration": [[0, 0, 0, 0, 0, 0, 0, 0], [255, 129, 189, 165, 165, 189, 129, 255], [0, 0, 0, 0, 0, 0, 0, 0]],
-                }
+                },
+                "animations_by_emotion": {},
+                "animation": {
+                    "max_bytes_per_s": 240,
+                    "idle_blink": True,
+                    "blink_interval_ms": 4500,
+                    "blink_jitter_ms": 2000,
+                    "blink_duration_ms": 150,
+                },
             },
         },
         "robot": {
@@ -155,23 +257,227 @@ def default_settings() -> dict:
     }
 
 
-def load_settings() -> dict:
-    defaults = default_settings()
-    if not SETTINGS_PATH.exists():
-        save_settings(defaults)
-        return defaults
-    try:
-        user = json.loads(SETTINGS_PATH.read_text(encoding="utf-8"))
-        if not isinstance(user, dict):
+class SettingsStore:
+    """Process-wide cache of the merged settings; the file is parsed again only when its mtime or size changes.
+
+    snapshot() and the typed getters share one dict that must not be mutated; load() returns a copy to edit.
+    Writes go to a temp file that is fsynced and renamed over settings.json, re-serializing only dirty subtrees.
+    """
+
+    def __init__(self, path: Path = SETTINGS_PATH) -> None:
+        self.path = path
+        self.generation = 0
+        self.writes = 0
+        self._lock = threading.RLock()
+        self._data = None
+        self._stamp = None
+        # Serialized JSON per subtree path, valid until that subtree is updated.
+        self._fragments: dict[str, str] = {}
+        # Debounced updates not yet on disk (path -> value); replayed if the file is re-read meanwhile.
+        self._pending: dict[str, Any] = {}
+        self._pending_since = 0.0
+        self._timer = None
+
+    def _file_stamp(self) -> tuple[int, int] | None:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read(self) -> dict:
+        defaults = default_settings()
+        if not self.path.exists():
+            # Fragments describe the old data; rebuild the file from the defaults alone.
+            self._fragments.clear()
+            self._write(defaults)
             return defaults
-        return _merge_dict(defaults, user)
-    except (OSError, json.JSONDecodeError):
-        return defaults
+        try:
+            user = json.loads(self.path.read_text(encoding="utf-8"))
+            if not isinstance(user, dict):
+                return defaults
+            return _merge_dict(defaults, user)
+        except (OSError, json.JSONDecodeError):
+            return defaults
+
+    def _write(self, settings: dict) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        text = self._serialize(settings)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as handle:
+                handle.write(text)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError:
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+            raise
+        self.writes += 1
+
+    def _serialize(self, settings: dict) -> str:
+        # Same text as json.dumps(settings, indent=2), assembled from cached subtree fragments.
+        return self._fragment("", settings, 0)
+
+    def _fragment(self, path: str, value: Any, level: int) -> str:
+        if level < _FRAGMENT_DEPTH and isinstance(value, dict) and value:
+            pad = "  " * level
+            items = []
+            for key, child in value.items():
+                child_path = f"{path}.{key}" if path else str(key)
+                items.append(f"{pad}  {json.dumps(str(key))}: {self._fragment(child_path, child, level + 1)}")
+            return "{\n" + ",\n".join(items) + "\n" + pad + "}"
+        cached = self._fragments.get(path)
+        if cached is None:
+            cached = json.dumps(value, indent=2).replace("\n", "\n" + "  " * level)
+            self._fragments[path] = cached
+        return cached
+
+    def _mark_dirty(self, path: str) -> None:
+        for cached in list(self._fragments):
+            if cached == path or cached.startswith(path + ".") or path.startswith(cached + "."):
+                del self._fragments[cached]
+
+    def changed(self) -> bool:
+        with self._lock:
+            return self._data is None or self._file_stamp() != self._stamp
+
+    def refresh(self) -> bool:
+        """Re-reads the file if it changed on disk; True when the cached settings were replaced."""
+        with self._lock:
+            if not self.changed():
+                return False
+            data = self._read()
+            self._stamp = self._file_stamp()
+            self._fragments.clear()
+            for path, value in self._pending.items():
+                data = _with_value(data, path, value)
+            self._data = data
+            self.generation += 1
+            return True
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.flush()
+            self._stamp = None
+            self._data = None
+            self._fragments.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self.refresh()
+            return self._data
+
+    def load(self) -> dict:
+        return copy.deepcopy(self.snapshot())
+
+    def save(self, settings: dict) -> None:
+        with self._lock:
+            self._cancel_timer()
+            self._pending = {}
+            self._fragments.clear()
+            self._write(settings)
+            self._data = _merge_dict(default_settings(), settings)
+            self._stamp = self._file_stamp()
+            self.generation += 1
+
+    def update(self, path: str, value: Any, delay_s: float = SAVE_DEBOUNCE_S) -> None:
+        """Sets one value and schedules a debounced write; readers see the new value right away."""
+        with self._lock:
+            value = copy.deepcopy(value)
+            self._data = _with_value(self.snapshot(), path, value)
+            self._mark_dirty(path)
+            self.generation += 1
+            now = time.monotonic()
+            if not self._pending:
+                self._pending_since = now
+            # Updating a parent path supersedes earlier updates below it.
+            for other in list(self._pending):
+                if other.startswith(path + "."):
+                    del self._pending[other]
+            self._pending[path] = value
+            self._cancel_timer()
+            wait = min(max(0.0, delay_s), max(0.0, self._pending_since + SAVE_MAX_DELAY_S - now))
+            self._timer = threading.Timer(wait, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._cancel_timer()
+            if not self._pending:
+                return
+            self._write(self._data)
+            self._pending = {}
+            self._stamp = self._file_stamp()
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def get(self, path: str, fallback: Any = None) -> Any:
+        return get_by_path(self.snapshot(), path, fallback)
+
+    def get_int(self, path: str, fallback: int = 0) -> int:
+        try:
+            return int(self.get(path, fallback))
+        except (TypeError, ValueError):
+            return fallback
+
+    def get_float(self, path: str, fallback: float = 0.0) -> float:
+        try:
+            return float(self.get(path, fallback))
+        except (TypeError, ValueError):
+            return fallback
+
+    def get_bool(self, path: str, fallback: bool = False) -> bool:
+        return bool(self.get(path, fallback))
+
+    def get_str(self, path: str, fallback: str = "") -> str:
+        value = self.get(path, fallback)
+        return fallback if value is None else str(value)
+
+    def get_dict(self, path: str) -> dict:
+        value = self.get(path, {})
+        return value if isinstance(value, dict) else {}
+
+    def get_list(self, path: str) -> list:
+        value = self.get(path, [])
+        return value if isinstance(value, list) else []
+
+
+def _with_value(data: dict, path: str, value: Any) -> dict:
+    # Copies only the dicts along the path, so earlier snapshots stay untouched.
+    data = dict(data)
+    current = data
+    parts = path.split(".")
+    for part in parts[:-1]:
+        child = current.get(part)
+        child = dict(child) if isinstance(child, dict) else {}
+        current[part] = child
+        current = child
+    current[parts[-1]] = value
+    return data
+
+
+_STORE = SettingsStore()
+atexit.register(_STORE.flush)
+
+
+def settings_store() -> SettingsStore:
+    return _STORE
+
+
+def load_settings() -> dict:
+    return _STORE.load()
 
 
 def save_settings(settings: dict) -> None:
-    SETTINGS_PATH.parent.mkdir(parents=True, exist_ok=True)
-    SETTINGS_PATH.write_text(json.dumps(settings, indent=2), encoding="utf-8")
+    _STORE.save(settings)
 
 
 def get_by_path(data: dict, path: str, fallback: Any = None) -> Any:
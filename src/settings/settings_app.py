@@ -14,8 +14,11 @@ FIELD_SPECS = [
     ("Desktop: Serial Baud", "desktop_app.serial.baud", int),
     ("Desktop: Serial Timeout", "desktop_app.serial.timeout", float),
     ("Desktop: Pan Auto Speed ms", "desktop_app.pan_auto_speed_ms", int),
+    ("Desktop: Settings Watch Interval ms (0 = off)", "desktop_app.settings_watch_interval_ms", int),
     ("Desktop: Emotion Buzzer Enabled", "desktop_app.emotion_buzzer_enabled", bool),
     ("Desktop: Emotion Buzzer Min Intensity", "desktop_app.emotion_buzzer_min_intensity", int),
+    ("Desktop: Emotion Baseline", "desktop_app.emotion_model.baseline", int),
+    ("Desktop: Emotion Half-life (s)", "desktop_app.emotion_model.half_life_s", float),
     ("Control Lab: Pan Auto Speed ms", "desktop_app.control_lab.default_pan_auto_speed_ms", int),
     ("Control Lab: Emotion Buzzer Enabled", "desktop_app.control_lab.default_emotion_buzzer_enabled", bool),
     ("Desktop: LLM Model", "desktop_app.llm.model_name", str),
@@ -26,6 +29,29 @@ FIELD_SPECS = [
     ("Desktop: Repetition Penalty", "desktop_app.llm.repetition_penalty", float),
     ("Desktop: Temperature", "desktop_app.llm.temperature", float),
     ("Desktop: Top P", "desktop_app.llm.top_p", float),
+    ("Desktop: Prefix KV Cache", "desktop_app.llm.prefix_cache", bool),
+    ("Desktop: History Token Budget", "desktop_app.llm.history_token_budget", int),
+    ("Desktop: Load Profile (auto/fp32/bf16/int8/low_mem)", "desktop_app.llm.load_profile", str),
+    ("Desktop: Assisted Generation (draft model)", "desktop_app.llm.assisted_generation", bool),
+    ("Desktop: Assistant Model Name (empty = fallbacks)", "desktop_app.llm.assistant_model_name", str),
+    ("Desktop: LLM Queue Size", "desktop_app.llm.queue_size", int),
+    ("Desktop: LLM Request Timeout (s)", "desktop_app.llm.request_timeout_s", float),
+    ("Desktop: Response Cache", "desktop_app.llm.response_cache", bool),
+    ("Desktop: Response Cache Size", "desktop_app.llm.response_cache_size", int),
+    ("Desktop: Response Cache TTL (s)", "desktop_app.llm.response_cache_ttl_s", float),
+    ("Desktop: Response Cache Variants", "desktop_app.llm.response_cache_variants", int),
+    ("Desktop: Response Cache Explore (0-1)", "desktop_app.llm.response_cache_explore", float),
+    ("Desktop: Response Cache Path", "desktop_app.llm.response_cache_path", str),
+    ("Desktop: LLM Backend (process/transformers = in-process/onnx/openai)", "desktop_app.llm.backend", str),
+    ("Desktop: Backend URL", "desktop_app.llm.backend_url", str),
+    ("Desktop: Backend Model", "desktop_app.llm.backend_model", str),
+    ("Desktop: Backend API Key", "desktop_app.llm.backend_api_key", str),
+    ("Desktop: Backend Timeout (s)", "desktop_app.llm.backend_timeout_s", float),
+    ("Desktop: ONNX Model Dir", "desktop_app.llm.onnx_model_dir", str),
+    ("Desktop: ONNX Sentiment Dir", "desktop_app.llm.onnx_sentiment_dir", str),
+    ("Desktop: Worker Backend (transformers/onnx/openai)", "desktop_app.llm.worker_backend", str),
+    ("Desktop: Worker Health Interval (s)", "desktop_app.llm.worker_health_interval_s", float),
+    ("Desktop: Worker Ping Timeout (s)", "desktop_app.llm.worker_ping_timeout_s", float),
     ("Robot Pin: Drive Left", "robot.pins.drive_left", int),
     ("Robot Pin: Drive Right", "robot.pins.drive_right", int),
     ("Robot Pin: Sonar Pan", "robot.pins.sonar_pan", int),